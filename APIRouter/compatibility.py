@@ -1,6 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
+import json
+from .mbti import MBTI_TYPES, MBTI_CODES, MBTI_SCORES, is_valid_mbti, mbti_score
+from .http_cache import CachedJson
+from .user_loader import UserLoader
 
 router = APIRouter(prefix="/api/compatibility", tags=["compatibility"])
 
@@ -8,6 +13,14 @@ class CompatibilityRequest(BaseModel):
     user_id_1: int
     user_id_2: int
 
+class BatchCompatibilityRequest(BaseModel):
+    # pairs 또는 (user_id + target_user_ids) 중 하나
+    pairs: Optional[List[CompatibilityRequest]] = None
+    user_id: Optional[int] = None
+    target_user_ids: Optional[List[int]] = None
+
+MAX_BATCH_PAIRS = 1000
+
 class ManualCompatibilityRequest(BaseModel):
     mbti_1: str
     mbti_2: str
@@ -27,30 +40,7 @@ def get_db():
 
 def calculate_mbti_compatibility(mbti1: str, mbti2: str) -> int:
     """MBTI 궁합 점수 계산"""
-    compatibility_map = {
-        "INFJ": {"ENFP": 100, "ENTP": 89, "INFP": 86, "INTJ": 75, "INTP": 86, "ENFJ": 89, "ENTJ": 89, "ISFJ": 50, "ISFP": 61, "ISTJ": 50, "ISTP": 61, "ESFJ": 64, "ESFP": 75, "ESTJ": 64, "ESTP": 75},
-        "INFP": {"ENFJ": 100, "ENTJ": 89, "INFJ": 86, "INTJ": 86, "INTP": 75, "ENFP": 89, "ENTP": 89, "ISFJ": 61, "ISFP": 50, "ISTJ": 61, "ISTP": 50, "ESFJ": 75, "ESFP": 64, "ESTJ": 75, "ESTP": 64},        
-        "ENFJ": {"INFP": 100, "INTP": 100, "INFJ": 89, "INTJ": 89, "ENFP": 100, "ENTP": 100, "ISFJ": 64, "ISFP": 75, "ISTJ": 64, "ISTP": 75, "ESFJ": 100, "ESFP": 89, "ESTJ": 100, "ESTP": 89},        
-        "ENFP": {"INFJ": 100, "INTJ": 100, "INFP": 89, "INTP": 89, "ENFJ": 100, "ENTJ": 100, "ISFJ": 75, "ISFP": 64, "ISTJ": 75, "ISTP": 64, "ESFJ": 89, "ESFP": 100, "ESTJ": 89, "ESTP": 100},        
-        "INTJ": {"ENFP": 100, "ENTP": 100, "INFJ": 75, "INFP": 86, "INTP": 86, "ENFJ": 89, "ENTJ": 89, "ISFJ": 50, "ISFP": 61, "ISTJ": 50, "ISTP": 61, "ESFJ": 64, "ESFP": 75, "ESTJ": 64, "ESTP": 75},        
-        "INTP": {"ENFJ": 100, "ENTJ": 100, "INFJ": 86, "INFP": 75, "INTJ": 86, "ENFP": 89, "ENTP": 89, "ISFJ": 61, "ISFP": 50, "ISTJ": 61, "ISTP": 50, "ESFJ": 75, "ESFP": 64, "ESTJ": 75, "ESTP": 64},        
-        "ENTJ": {"INFP": 100, "INTP": 100, "INFJ": 89, "INTJ": 89, "ENFJ": 100, "ENTP": 100, "ISFJ": 64, "ISFP": 75, "ISTJ": 64, "ISTP": 75, "ESFJ": 100, "ESFP": 89, "ESTJ": 100, "ESTP": 89},        
-        "ENTP": {"INFJ": 100, "INTJ": 100, "INFP": 89, "INTP": 89, "ENFJ": 100, "ENTJ": 100, "ISFJ": 75, "ISFP": 64, "ISTJ": 75, "ISTP": 64, "ESFJ": 89, "ESFP": 100, "ESTJ": 89, "ESTP": 100},        
-        "ISFJ": {"ESFP": 100, "ESTP": 89, "ISFP": 86, "ISTJ": 75, "ISTP": 86, "ESFJ": 89, "ESTJ": 89, "INFJ": 50, "INFP": 61, "INTJ": 50, "INTP": 61, "ENFJ": 64, "ENFP": 75, "ENTJ": 64, "ENTP": 75},
-        "ISFP": {"ESFJ": 100, "ESTJ": 89, "ISFJ": 86, "ISTJ": 86, "ISTP": 75, "ESFP": 89, "ESTP": 89, "INFJ": 61, "INFP": 50, "INTJ": 61, "INTP": 50, "ENFJ": 75, "ENFP": 64, "ENTJ": 75, "ENTP": 64},
-        "ESFJ": {"ISFP": 100, "ISTP": 100, "ISFJ": 89, "ISTJ": 89, "ESFP": 100, "ESTP": 100, "INFJ": 64, "INFP": 75, "INTJ": 64, "INTP": 75, "ENFJ": 100, "ENFP": 89, "ENTJ": 100, "ENTP": 89},        
-        "ESFP": {"ISFJ": 100, "ISTJ": 100, "ISFP": 89, "ISTP": 89, "ESFJ": 100, "ESTJ": 100, "INFJ": 75, "INFP": 64, "INTJ": 75, "INTP": 64, "ENFJ": 89, "ENFP": 100, "ENTJ": 89, "ENTP": 100},        
-        "ISTJ": {"ESFP": 100, "ESTP": 89, "ISFJ": 75, "ISFP": 86, "ISTP": 86, "ESFJ": 89, "ESTJ": 89, "INFJ": 50, "INFP": 61, "INTJ": 50, "INTP": 61, "ENFJ": 64, "ENFP": 75, "ENTJ": 64, "ENTP": 75},        
-        "ISTP": {"ESFJ": 100, "ESTJ": 100, "ISFJ": 86, "ISFP": 75, "ISTJ": 86, "ESFP": 89, "ESTP": 89, "INFJ": 61, "INFP": 50, "INTJ": 61, "INTP": 50, "ENFJ": 75, "ENFP": 64, "ENTJ": 75, "ENTP": 64},        
-        "ESTJ": {"ISFP": 100, "ISTP": 100, "ISFJ": 89, "ISTJ": 89, "ESFJ": 100, "ESTP": 100, "INFJ": 64, "INFP": 75, "INTJ": 64, "INTP": 75, "ENFJ": 100, "ENFP": 89, "ENTJ": 100, "ENTP": 89},        
-        "ESTP": {"ISFJ": 100, "ISTJ": 100, "ISFP": 89, "ISTP": 89, "ESFJ": 100, "ESTJ": 100, "INFJ": 75, "INFP": 64, "INTJ": 75, "INTP": 64, "ENFJ": 89, "ENFP": 100, "ENTJ": 89, "ENTP": 100},
-    }
-    
-    if mbti1 in compatibility_map and mbti2 in compatibility_map[mbti1]:
-        return compatibility_map[mbti1][mbti2]
-    if mbti1 == mbti2:
-        return 75
-    return 60
+    return mbti_score(mbti1, mbti2)
 
 
 def calculate_total_compatibility(
@@ -59,7 +49,19 @@ def calculate_total_compatibility(
     temperature1: float, temperature2: float
 ) -> dict:
     
-    mbti_score = calculate_mbti_compatibility(mbti1, mbti2)
+    return combine_compatibility(
+        calculate_mbti_compatibility(mbti1, mbti2),
+        heart_rate1, heart_rate2,
+        temperature1, temperature2
+    )
+
+
+def combine_compatibility(
+    mbti_score: int,
+    heart_rate1: int, heart_rate2: int,
+    temperature1: float, temperature2: float
+) -> dict:
+    """MBTI 점수와 심박수/체온 유사도를 종합 점수로 계산"""
     
     # 심박수 유사도
     heart_rate_diff = abs(heart_rate1 - heart_rate2)
@@ -109,60 +111,31 @@ def calculate_compatibility_by_users(
 ):
     """두 사용자의 궁합 계산 (DB에서 정보 조회)"""
     try:
-        cursor = connection.cursor()
-        
-        # 사용자 1 정보 조회
-        cursor.execute("""
-            SELECT user_id, username, mbti, profile_image_url, heart_rate, temperature
-            FROM users WHERE user_id = %s
-        """, (request.user_id_1,))
-        user1 = cursor.fetchone()
+        # 두 사용자를 한 번에 조회
+        users = UserLoader(connection).load_many([request.user_id_1, request.user_id_2])
+        user1 = users.get(request.user_id_1)
+        user2 = users.get(request.user_id_2)
         
         if not user1:
-            cursor.close()
             raise HTTPException(status_code=404, detail=f"사용자 {request.user_id_1}를 찾을 수 없습니다")
         
-        # 사용자 2 정보 조회
-        cursor.execute("""
-            SELECT user_id, username, mbti, profile_image_url, heart_rate, temperature
-            FROM users WHERE user_id = %s
-        """, (request.user_id_2,))
-        user2 = cursor.fetchone()
-        
         if not user2:
-            cursor.close()
             raise HTTPException(status_code=404, detail=f"사용자 {request.user_id_2}를 찾을 수 없습니다")
         
-        cursor.close()
-        
         # Decimal을 float로 변환 (중요!)
-        temperature1 = float(user1[5]) if user1[5] is not None else 36.5
-        temperature2 = float(user2[5]) if user2[5] is not None else 36.5
+        temperature1 = float(user1["temperature"]) if user1["temperature"] is not None else 36.5
+        temperature2 = float(user2["temperature"]) if user2["temperature"] is not None else 36.5
         
         # 궁합 계산
         compatibility = calculate_total_compatibility(
-            user1[2], user2[2],  # MBTI
-            user1[4] or 70, user2[4] or 70,  # 심박수
+            user1["mbti"], user2["mbti"],  # MBTI
+            user1["heart_rate"] or 70, user2["heart_rate"] or 70,  # 심박수
             temperature1, temperature2  # 체온 (float로 변환됨)
         )
         
         return {
-            "user_1": {
-                "user_id": user1[0],
-                "username": user1[1],
-                "mbti": user1[2],
-                "profile_image_url": user1[3],
-                "heart_rate": user1[4],
-                "temperature": temperature1
-            },
-            "user_2": {
-                "user_id": user2[0],
-                "username": user2[1],
-                "mbti": user2[2],
-                "profile_image_url": user2[3],
-                "heart_rate": user2[4],
-                "temperature": temperature2
-            },
+            "user_1": {**user1, "temperature": temperature1},
+            "user_2": {**user2, "temperature": temperature2},
             "compatibility": compatibility
         }
         
@@ -172,22 +145,81 @@ def calculate_compatibility_by_users(
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
 
 
+@router.post("/calculate-batch")
+def calculate_compatibility_batch(
+    request: BatchCompatibilityRequest,
+    connection = Depends(get_db)
+):
+    """
+    여러 쌍의 궁합을 한 번에 계산
+    
+    pairs로 쌍 목록을 주거나, user_id 한 명과 target_user_ids 목록을 주면 됨
+    사용자는 한 번의 IN 쿼리로 조회하고, 결과는 요청 순서대로 NDJSON 한 줄씩 전송
+    (없는 사용자가 포함된 쌍은 error 필드로 표시)
+    """
+    if request.pairs is not None:
+        pairs = [(p.user_id_1, p.user_id_2) for p in request.pairs]
+    elif request.user_id is not None and request.target_user_ids is not None:
+        pairs = [(request.user_id, target_id) for target_id in request.target_user_ids]
+    else:
+        raise HTTPException(status_code=400, detail="pairs 또는 user_id와 target_user_ids를 입력하세요")
+    
+    if len(pairs) > MAX_BATCH_PAIRS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {MAX_BATCH_PAIRS}쌍까지 계산할 수 있습니다")
+    
+    user_ids = sorted({user_id for pair in pairs for user_id in pair})
+    
+    try:
+        loaded = UserLoader(connection).load_many(user_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+    
+    # 사용자별로 MBTI 코드와 기본값 적용된 측정값을 한 번만 준비
+    # (코드가 없는 검증되지 않은 MBTI만 문자열로 mbti_score 계산)
+    users = {
+        user_id: (
+            MBTI_CODES.get(user["mbti"]),
+            user["mbti"],
+            user["heart_rate"] or 70,
+            float(user["temperature"]) if user["temperature"] is not None else 36.5
+        )
+        for user_id, user in loaded.items()
+    }
+    
+    def generate():
+        for index, (user_id_1, user_id_2) in enumerate(pairs):
+            item = {"index": index, "user_id_1": user_id_1, "user_id_2": user_id_2}
+            user1 = users.get(user_id_1)
+            user2 = users.get(user_id_2)
+            
+            if user1 is None or user2 is None:
+                missing = user_id_1 if user1 is None else user_id_2
+                item["error"] = f"사용자 {missing}를 찾을 수 없습니다"
+            else:
+                if user1[0] is not None and user2[0] is not None:
+                    score = MBTI_SCORES[(user1[0] << 4) | user2[0]]
+                else:
+                    score = mbti_score(user1[1], user2[1])
+                item["compatibility"] = combine_compatibility(
+                    score,
+                    user1[2], user2[2],
+                    user1[3], user2[3]
+                )
+            
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @router.post("/calculate-manual")
 def calculate_compatibility_manual(request: ManualCompatibilityRequest):
     """수동으로 입력한 데이터로 궁합 계산 (DB 조회 없음)"""
     try:
         # MBTI 유효성 검사
-        valid_mbti = [
-            "ISTJ", "ISFJ", "INFJ", "INTJ",
-            "ISTP", "ISFP", "INFP", "INTP",
-            "ESTP", "ESFP", "ENFP", "ENTP",
-            "ESTJ", "ESFJ", "ENFJ", "ENTJ"
-        ]
-        
-        if request.mbti_1.upper() not in valid_mbti:
+        if not is_valid_mbti(request.mbti_1):
             raise HTTPException(status_code=400, detail=f"올바른 MBTI를 입력하세요: {request.mbti_1}")
         
-        if request.mbti_2.upper() not in valid_mbti:
+        if not is_valid_mbti(request.mbti_2):
             raise HTTPException(status_code=400, detail=f"올바른 MBTI를 입력하세요: {request.mbti_2}")
         
         # 궁합 계산
@@ -218,70 +250,72 @@ def calculate_compatibility_manual(request: ManualCompatibilityRequest):
         raise HTTPException(status_code=500, detail=f"계산 오류: {str(e)}")
 
 
-@router.get("/mbti/{mbti1}/{mbti2}")
-def get_mbti_compatibility(mbti1: str, mbti2: str):
-    """MBTI 궁합만 계산"""
-    try:
-        valid_mbti = [
-            "ISTJ", "ISFJ", "INFJ", "INTJ",
-            "ISTP", "ISFP", "INFP", "INTP",
-            "ESTP", "ESFP", "ENFP", "ENTP",
-            "ESTJ", "ESFJ", "ENFJ", "ENTJ"
-        ]
-        
-        mbti1 = mbti1.upper()
-        mbti2 = mbti2.upper()
-        
-        if mbti1 not in valid_mbti:
-            raise HTTPException(status_code=400, detail=f"올바른 MBTI를 입력하세요: {mbti1}")
-        
-        if mbti2 not in valid_mbti:
-            raise HTTPException(status_code=400, detail=f"올바른 MBTI를 입력하세요: {mbti2}")
-        
-        score = calculate_mbti_compatibility(mbti1, mbti2)
-        
-        # 점수에 따른 설명
-        if score >= 90:
-            description = "최고의 궁합! 환상의 커플입니다 💕"
-        elif score >= 80:
-            description = "매우 좋은 궁합! 서로를 잘 이해합니다 💝"
-        elif score >= 70:
-            description = "좋은 궁합! 노력하면 잘 맞을 수 있습니다 💗"
-        elif score >= 60:
-            description = "보통 궁합! 서로 이해하려는 노력이 필요합니다 💛"
-        else:
-            description = "조금 어려운 궁합! 하지만 사랑이 있다면 극복 가능합니다 💙"
-        
-        return {
-            "mbti_1": mbti1,
-            "mbti_2": mbti2,
-            "score": score,
-            "description": description
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"계산 오류: {str(e)}")
+def describe_mbti_score(score: int) -> str:
+    """점수에 따른 설명"""
+    if score >= 90:
+        return "최고의 궁합! 환상의 커플입니다 💕"
+    elif score >= 80:
+        return "매우 좋은 궁합! 서로를 잘 이해합니다 💝"
+    elif score >= 70:
+        return "좋은 궁합! 노력하면 잘 맞을 수 있습니다 💗"
+    elif score >= 60:
+        return "보통 궁합! 서로 이해하려는 노력이 필요합니다 💛"
+    else:
+        return "조금 어려운 궁합! 하지만 사랑이 있다면 극복 가능합니다 💙"
 
 
-@router.get("/mbti-chart")
-def get_mbti_compatibility_chart():
-    mbti_types = [
-        "ISTJ", "ISFJ", "INFJ", "INTJ",
-        "ISTP", "ISFP", "INFP", "INTP",
-        "ESTP", "ESFP", "ENFP", "ENTP",
-        "ESTJ", "ESFJ", "ENFJ", "ENTJ"
-    ]
-    
+def _build_mbti_responses() -> list:
+    """MBTI 두 개 조합별 응답 (인덱스: code1 << 4 | code2)"""
+    responses = [None] * 256
+    for mbti1, code1 in MBTI_CODES.items():
+        for mbti2, code2 in MBTI_CODES.items():
+            score = MBTI_SCORES[(code1 << 4) | code2]
+            responses[(code1 << 4) | code2] = CachedJson({
+                "mbti_1": mbti1,
+                "mbti_2": mbti2,
+                "score": score,
+                "description": describe_mbti_score(score)
+            })
+    return responses
+
+
+def _build_mbti_chart() -> CachedJson:
     chart = {}
     
-    for mbti1 in mbti_types:
-        chart[mbti1] = {}
-        for mbti2 in mbti_types:
-            chart[mbti1][mbti2] = calculate_mbti_compatibility(mbti1, mbti2)
+    for mbti1 in MBTI_TYPES:
+        row = MBTI_CODES[mbti1] << 4
+        chart[mbti1] = {
+            mbti2: MBTI_SCORES[row | MBTI_CODES[mbti2]]
+            for mbti2 in MBTI_TYPES
+        }
     
-    return {
-        "mbti_types": mbti_types,
+    return CachedJson({
+        "mbti_types": MBTI_TYPES,
         "compatibility_chart": chart
-    }
\ No newline at end of file
+    })
+
+
+# 정적 응답은 시작 시 한 번만 직렬화
+MBTI_RESPONSES = _build_mbti_responses()
+MBTI_CHART_RESPONSE = _build_mbti_chart()
+
+
+@router.get("/mbti/{mbti1}/{mbti2}")
+def get_mbti_compatibility(mbti1: str, mbti2: str, request: Request):
+    """MBTI 궁합만 계산"""
+    code1 = MBTI_CODES.get(mbti1.upper())
+    code2 = MBTI_CODES.get(mbti2.upper())
+    
+    if code1 is None:
+        raise HTTPException(status_code=400, detail=f"올바른 MBTI를 입력하세요: {mbti1.upper()}")
+    
+    if code2 is None:
+        raise HTTPException(status_code=400, detail=f"올바른 MBTI를 입력하세요: {mbti2.upper()}")
+    
+    return MBTI_RESPONSES[(code1 << 4) | code2].response(request)
+
+
+@router.get("/mbti-chart")
+def get_mbti_compatibility_chart(request: Request):
+    """MBTI 궁합표 전체 조회 (시작 시 직렬화한 응답, ETag 지원)"""
+    return MBTI_CHART_RESPONSE.response(request)
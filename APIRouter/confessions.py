@@ -1,6 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from typing import Optional, List
+from .leaderboard import leaderboard
+from .couples import insert_couple
+from .schema import schema
+from .pubsub import hub, forward_to_websocket
+from .db_errors import is_duplicate_entry
+from .user_loader import UserLoader
+from .export import export_response
+from .pagination import DEFAULT_PAGE_SIZE, clamp_limit, decode_cursor, next_cursor
 
 router = APIRouter(prefix="/api/confessions", tags=["confessions"])
 
@@ -22,21 +30,58 @@ def get_db():
         connection.close()
 
 
+def confession_topic(user_id: int) -> str:
+    return f"confessions:{user_id}"
+
+
+def publish_confession_event(event: str, confession_id: int, from_user_id: int, to_user_id: int, status: Optional[str] = None):
+    """보낸 사람/받은 사람 구독자에게 고백 변경 알림 (커밋 후 호출)"""
+    message = {
+        "type": event,
+        "confession_id": confession_id,
+        "from_user_id": from_user_id,
+        "to_user_id": to_user_id,
+        "status": status
+    }
+    hub.publish(confession_topic(from_user_id), message)
+    hub.publish(confession_topic(to_user_id), message)
+
+
+@router.websocket("/ws/{user_id}")
+async def websocket_confessions(websocket: WebSocket, user_id: int):
+    """
+    고백 변경 알림 (created, status_changed, deleted)
+    
+    알림에는 id/상태만 있으므로 목록이 필요하면 알림을 받은 뒤 다시 조회
+    resync를 받으면 목록 전체를 다시 조회
+    """
+    await websocket.accept()
+    queue = hub.subscribe(confession_topic(user_id))
+    try:
+        await websocket.send_json({"type": "subscribed", "user_id": user_id})
+        await forward_to_websocket(websocket, queue)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(confession_topic(user_id), queue)
+
+
 @router.post("")
 def create_confession(confession: ConfessionCreate, connection = Depends(get_db)):
     """고백 전송"""
     try:
         cursor = connection.cursor()
         
-        # 보내는 사람 확인
-        cursor.execute("SELECT user_id FROM users WHERE user_id = %s", (confession.from_user_id,))
-        if not cursor.fetchone():
+        # 보내는 사람/받는 사람 한 번에 확인
+        users = UserLoader(connection).load_many([confession.from_user_id, confession.to_user_id])
+        from_user = users.get(confession.from_user_id)
+        to_user = users.get(confession.to_user_id)
+        
+        if not from_user:
             cursor.close()
             raise HTTPException(status_code=404, detail="보내는 사용자를 찾을 수 없습니다")
         
-        # 받는 사람 확인
-        cursor.execute("SELECT user_id FROM users WHERE user_id = %s", (confession.to_user_id,))
-        if not cursor.fetchone():
+        if not to_user:
             cursor.close()
             raise HTTPException(status_code=404, detail="받는 사용자를 찾을 수 없습니다")
         
@@ -45,54 +90,56 @@ def create_confession(confession: ConfessionCreate, connection = Depends(get_db)
             cursor.close()
             raise HTTPException(status_code=400, detail="자기 자신에게 고백할 수 없습니다")
         
-        # 이미 고백한 적이 있는지 확인
-        cursor.execute("""
-            SELECT confession_id FROM confessions 
-            WHERE from_user_id = %s AND to_user_id = %s AND status = 'pending'
-        """, (confession.from_user_id, confession.to_user_id))
-        
-        if cursor.fetchone():
-            cursor.close()
-            raise HTTPException(status_code=400, detail="이미 고백을 보냈습니다")
+        # 007_pair_unique_keys 전이면 인덱스 대신 직접 확인
+        schema.ensure_loaded(cursor)
+        if not schema.has_index("confessions", "uq_confessions_pending"):
+            cursor.execute("""
+                SELECT confession_id FROM confessions 
+                WHERE from_user_id = %s AND to_user_id = %s AND status = 'pending'
+            """, (confession.from_user_id, confession.to_user_id))
+            
+            if cursor.fetchone():
+                cursor.close()
+                raise HTTPException(status_code=400, detail="이미 고백을 보냈습니다")
         
-        # 고백 생성
+        # 고백 생성 (대기 중인 같은 방향 고백이 있으면 UNIQUE 인덱스가 거부)
         insert_query = """
             INSERT INTO confessions (from_user_id, to_user_id, message, status)
             VALUES (%s, %s, %s, 'pending')
         """
-        cursor.execute(insert_query, (
-            confession.from_user_id,
-            confession.to_user_id,
-            confession.message
-        ))
+        try:
+            cursor.execute(insert_query, (
+                confession.from_user_id,
+                confession.to_user_id,
+                confession.message
+            ))
+        except Exception as e:
+            if not is_duplicate_entry(e, "uq_confessions_pending"):
+                raise
+            connection.rollback()
+            cursor.close()
+            raise HTTPException(status_code=400, detail="이미 고백을 보냈습니다")
         connection.commit()
         confession_id = cursor.lastrowid
         
-        # 생성된 고백 조회
-        cursor.execute("""
-            SELECT c.confession_id, c.from_user_id, u1.username as from_username,
-                   c.to_user_id, u2.username as to_username, c.status, c.message, c.created_at
-            FROM confessions c
-            JOIN users u1 ON c.from_user_id = u1.user_id
-            JOIN users u2 ON c.to_user_id = u2.user_id
-            WHERE c.confession_id = %s
-        """, (confession_id,))
-        
-        result = cursor.fetchone()
+        # 생성 시각만 다시 읽음 (사용자 정보는 이미 조회함)
+        cursor.execute("SELECT created_at FROM confessions WHERE confession_id = %s", (confession_id,))
+        created_at = cursor.fetchone()[0]
         cursor.close()
+        publish_confession_event("created", confession_id, confession.from_user_id, confession.to_user_id, "pending")
         
         return {
             "success": True,
             "message": "고백이 전송되었습니다",
             "confession": {
-                "confession_id": result[0],
-                "from_user_id": result[1],
-                "from_username": result[2],
-                "to_user_id": result[3],
-                "to_username": result[4],
-                "status": result[5],
-                "message": result[6],
-                "created_at": result[7].isoformat() if result[7] else None
+                "confession_id": confession_id,
+                "from_user_id": confession.from_user_id,
+                "from_username": from_user["username"],
+                "to_user_id": confession.to_user_id,
+                "to_username": to_user["username"],
+                "status": "pending",
+                "message": confession.message,
+                "created_at": created_at.isoformat() if created_at else None
             }
         }
         
@@ -103,90 +150,213 @@ def create_confession(confession: ConfessionCreate, connection = Depends(get_db)
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
 
 
-@router.get("/received/{user_id}")
-def get_received_confessions(user_id: int, connection = Depends(get_db)):
-    """받은 고백 목록 조회"""
+CONFESSION_STATUSES = ['pending', 'accepted', 'rejected']
+
+
+def count_confessions_by_status(cursor, user_column: str, user_id: int) -> dict:
+    """상태별 고백 수 (인덱스만 읽음)"""
+    cursor.execute(f"""
+        SELECT status, COUNT(*)
+        FROM confessions
+        WHERE {user_column} = %s
+        GROUP BY status
+    """, (user_id,))
+    counts = {status: 0 for status in CONFESSION_STATUSES}
+    for row in cursor.fetchall():
+        counts[row[0]] = row[1]
+    return counts
+
+
+def fetch_confession_page(cursor, user_column: str, other_column: str, user_id: int,
+                          status: Optional[str], limit: int, page_cursor: Optional[str]):
+    """
+    (created_at, confession_id) 키셋으로 최신순 한 페이지 조회
+
+    Returns:
+        (행 목록, 다음 커서 또는 None)
+        행: confession_id, 상대 user_id, status, message, created_at
+    """
+    conditions = [f"c.{user_column} = %s"]
+    params = [user_id]
+    if status:
+        conditions.append("c.status = %s")
+        params.append(status)
+    if page_cursor:
+        before_created_at, before_confession_id = decode_cursor(page_cursor)
+        conditions.append("(c.created_at < %s OR (c.created_at = %s AND c.confession_id < %s))")
+        params += [before_created_at, before_created_at, before_confession_id]
+    params.append(limit + 1)
+    
+    cursor.execute(f"""
+        SELECT c.confession_id, c.{other_column}, c.status, c.message, c.created_at
+        FROM confessions c
+        WHERE {' AND '.join(conditions)}
+        ORDER BY c.created_at DESC, c.confession_id DESC
+        LIMIT %s
+    """, params)
+    return next_cursor(cursor.fetchall(), limit, 4, 0)
+
+
+def list_confessions(connection, direction: str, user_id: int,
+                     status: Optional[str], limit: int, page_cursor: Optional[str]) -> dict:
+    """받은(received)/보낸(sent) 고백 목록 공통 처리"""
+    if status is not None and status not in CONFESSION_STATUSES:
+        raise HTTPException(status_code=400, detail="올바른 상태를 입력하세요 (pending, accepted, rejected)")
+    
+    if direction == "received":
+        user_column, other_column, prefix = "to_user_id", "from_user_id", "from"
+    else:
+        user_column, other_column, prefix = "from_user_id", "to_user_id", "to"
+    
     try:
         cursor = connection.cursor()
-        
-        query = """
-            SELECT c.confession_id, c.from_user_id, u1.username as from_username,
-                   u1.mbti as from_mbti, u1.profile_image_url as from_profile,
-                   c.status, c.message, c.created_at
-            FROM confessions c
-            JOIN users u1 ON c.from_user_id = u1.user_id
-            WHERE c.to_user_id = %s
-            ORDER BY c.created_at DESC
-        """
-        cursor.execute(query, (user_id,))
-        results = cursor.fetchall()
+        rows, next_page = fetch_confession_page(
+            cursor, user_column, other_column, user_id,
+            status, clamp_limit(limit), page_cursor
+        )
+        status_counts = count_confessions_by_status(cursor, user_column, user_id)
         cursor.close()
         
-        confessions = [
-            {
+        # 상대 사용자 정보는 조인 대신 사용자 로더로 (캐시가 따뜻하면 DB 조회 없음)
+        users = UserLoader(connection).load_many([row[1] for row in rows])
+        
+        confessions = []
+        for row in rows:
+            other = users.get(row[1])
+            if not other:
+                continue
+            confessions.append({
                 "confession_id": row[0],
-                "from_user_id": row[1],
-                "from_username": row[2],
-                "from_mbti": row[3],
-                "from_profile_image_url": row[4],
-                "status": row[5],
-                "message": row[6],
-                "created_at": row[7].isoformat() if row[7] else None
-            }
-            for row in results
-        ]
+                f"{prefix}_user_id": row[1],
+                f"{prefix}_username": other["username"],
+                f"{prefix}_mbti": other["mbti"],
+                f"{prefix}_profile_image_url": other["profile_image_url"],
+                "status": row[2],
+                "message": row[3],
+                "created_at": row[4].isoformat() if row[4] else None
+            })
         
         return {
             "user_id": user_id,
             "count": len(confessions),
-            "confessions": confessions
+            "total": sum(status_counts.values()),
+            "status_counts": status_counts,
+            "confessions": confessions,
+            "next_cursor": next_page
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
 
 
+@router.get("/received/{user_id}")
+def get_received_confessions(
+    user_id: int,
+    status: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    connection = Depends(get_db)
+):
+    """
+    받은 고백 목록 조회 (최신순, limit개씩)
+    
+    다음 페이지는 응답의 next_cursor를 cursor로 전달
+    """
+    return list_confessions(connection, "received", user_id, status, limit, cursor)
+
+
 @router.get("/sent/{user_id}")
-def get_sent_confessions(user_id: int, connection = Depends(get_db)):
-    """보낸 고백 목록 조회"""
+def get_sent_confessions(
+    user_id: int,
+    status: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    connection = Depends(get_db)
+):
+    """
+    보낸 고백 목록 조회 (최신순, limit개씩)
+    
+    다음 페이지는 응답의 next_cursor를 cursor로 전달
+    """
+    return list_confessions(connection, "sent", user_id, status, limit, cursor)
+
+
+def insert_couple_once(cursor, user_a_id: int, user_b_id: int, score: int, couple_name: str):
+    """
+    커플이 없을 때만 추가 (이미 있으면 UNIQUE 인덱스 충돌로 감지하고 기존 커플 사용)
+
+    007_pair_unique_keys 전이면 먼저 조회해서 확인
+    (호출한 쪽이 두 사용자 행을 잠근 상태라 같은 쌍의 동시 수락은 순서대로 처리됨)
+
+    Returns:
+        (couple_id, score, couple_name, 새로 만들었는지)
+    """
+    schema.ensure_loaded(cursor)
+    if not schema.has_index("couple_ranking", "uq_couple_ranking_pair"):
+        cursor.execute("""
+            SELECT couple_id, score, couple_name FROM couple_ranking
+            WHERE (user_a_id = %s AND user_b_id = %s)
+               OR (user_a_id = %s AND user_b_id = %s)
+        """, (user_a_id, user_b_id, user_b_id, user_a_id))
+        existing = cursor.fetchone()
+        if existing:
+            return existing[0], existing[1], existing[2], False
+        insert_couple(cursor, user_a_id, user_b_id, score, couple_name)
+        return cursor.lastrowid, score, couple_name, True
+    
     try:
-        cursor = connection.cursor()
-        
-        query = """
-            SELECT c.confession_id, c.to_user_id, u2.username as to_username,
-                   u2.mbti as to_mbti, u2.profile_image_url as to_profile,
-                   c.status, c.message, c.created_at
-            FROM confessions c
-            JOIN users u2 ON c.to_user_id = u2.user_id
-            WHERE c.from_user_id = %s
-            ORDER BY c.created_at DESC
-        """
-        cursor.execute(query, (user_id,))
-        results = cursor.fetchall()
-        cursor.close()
-        
-        confessions = [
-            {
-                "confession_id": row[0],
-                "to_user_id": row[1],
-                "to_username": row[2],
-                "to_mbti": row[3],
-                "to_profile_image_url": row[4],
-                "status": row[5],
-                "message": row[6],
-                "created_at": row[7].isoformat() if row[7] else None
-            }
-            for row in results
-        ]
-        
-        return {
-            "user_id": user_id,
-            "count": len(confessions),
-            "confessions": confessions
-        }
-        
+        insert_couple(cursor, user_a_id, user_b_id, score, couple_name)
+        return cursor.lastrowid, score, couple_name, True
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+        if not is_duplicate_entry(e, "uq_couple_ranking_pair"):
+            raise
+    
+    cursor.execute("""
+        SELECT couple_id, score, couple_name FROM couple_ranking
+        WHERE pair_low = %s AND pair_high = %s
+    """, (min(user_a_id, user_b_id), max(user_a_id, user_b_id)))
+    existing = cursor.fetchone()
+    return existing[0], existing[1], existing[2], False
+
+
+def export_confessions(direction: str, user_id: int, status: Optional[str], export_format: str):
+    """받은(received)/보낸(sent) 고백 전체 내보내기 (최신순)"""
+    if status is not None and status not in CONFESSION_STATUSES:
+        raise HTTPException(status_code=400, detail="올바른 상태를 입력하세요 (pending, accepted, rejected)")
+    
+    if direction == "received":
+        user_column, other_column, prefix = "to_user_id", "from_user_id", "from"
+    else:
+        user_column, other_column, prefix = "from_user_id", "to_user_id", "to"
+    
+    query = f"""
+        SELECT c.confession_id, c.{other_column}, u.username, c.status, c.message, c.created_at
+        FROM confessions c
+        JOIN users u ON c.{other_column} = u.user_id
+        WHERE c.{user_column} = %s
+    """
+    params = [user_id]
+    if status:
+        query += " AND c.status = %s"
+        params.append(status)
+    query += " ORDER BY c.created_at DESC, c.confession_id DESC"
+    
+    columns = ["confession_id", f"{prefix}_user_id", f"{prefix}_username", "status", "message", "created_at"]
+    return export_response(query, params, columns, export_format, f"confessions_{direction}_{user_id}")
+
+
+@router.get("/received/{user_id}/export")
+def export_received_confessions(user_id: int, status: Optional[str] = None, format: str = "ndjson"):
+    """받은 고백 전체 내보내기 (NDJSON/CSV 스트리밍)"""
+    return export_confessions("received", user_id, status, format)
+
+
+@router.get("/sent/{user_id}/export")
+def export_sent_confessions(user_id: int, status: Optional[str] = None, format: str = "ndjson"):
+    """보낸 고백 전체 내보내기 (NDJSON/CSV 스트리밍)"""
+    return export_confessions("sent", user_id, status, format)
 
 
 @router.put("/{confession_id}")
@@ -195,107 +365,123 @@ def update_confession_status(
     update: ConfessionUpdate,
     connection = Depends(get_db)
 ):
-    """고백 수락/거절"""
+    """
+    고백 수락/거절
+    
+    고백과 두 사용자를 한 번에 잠가 읽고, 상태 변경과 (수락 시) 커플 생성을 한 트랜잭션으로 커밋
+    이미 커플이면 새로 만들지 않고 기존 커플을 반환
+    """
+    if update.status not in CONFESSION_STATUSES:
+        raise HTTPException(status_code=400, detail="올바른 상태를 입력하세요 (pending, accepted, rejected)")
+    
     try:
         cursor = connection.cursor()
         
-        # 고백 존재 확인
-        cursor.execute("SELECT * FROM confessions WHERE confession_id = %s", (confession_id,))
+        cursor.execute("""
+            SELECT c.confession_id, c.from_user_id, u1.username, u1.mbti, u1.heart_rate, u1.temperature,
+                   c.to_user_id, u2.username, u2.mbti, u2.heart_rate, u2.temperature,
+                   c.message, c.created_at
+            FROM confessions c
+            JOIN users u1 ON c.from_user_id = u1.user_id
+            JOIN users u2 ON c.to_user_id = u2.user_id
+            WHERE c.confession_id = %s
+            FOR UPDATE
+        """, (confession_id,))
         confession = cursor.fetchone()
         
         if not confession:
+            connection.rollback()
             cursor.close()
             raise HTTPException(status_code=404, detail="고백을 찾을 수 없습니다")
         
-        # 상태 검증
-        if update.status not in ['pending', 'accepted', 'rejected']:
+        from_user_id = confession[1]
+        to_user_id = confession[6]
+        
+        # 007_pair_unique_keys 전이면 대기 중으로 되돌릴 때 인덱스 대신 직접 확인
+        schema.ensure_loaded(cursor)
+        if update.status == "pending" and not schema.has_index("confessions", "uq_confessions_pending"):
+            cursor.execute("""
+                SELECT confession_id FROM confessions
+                WHERE from_user_id = %s AND to_user_id = %s AND status = 'pending'
+                AND confession_id <> %s
+            """, (from_user_id, to_user_id, confession_id))
+            
+            if cursor.fetchone():
+                connection.rollback()
+                cursor.close()
+                raise HTTPException(status_code=400, detail="같은 상대에게 대기 중인 고백이 이미 있습니다")
+        
+        try:
+            cursor.execute("""
+                UPDATE confessions 
+                SET status = %s 
+                WHERE confession_id = %s
+            """, (update.status, confession_id))
+        except Exception as e:
+            # 대기 중으로 되돌릴 때 같은 방향의 다른 대기 고백이 있는 경우
+            if not is_duplicate_entry(e, "uq_confessions_pending"):
+                raise
+            connection.rollback()
             cursor.close()
-            raise HTTPException(status_code=400, detail="올바른 상태를 입력하세요 (pending, accepted, rejected)")
+            raise HTTPException(status_code=400, detail="같은 상대에게 대기 중인 고백이 이미 있습니다")
         
-        # 상태 업데이트
-        cursor.execute("""
-            UPDATE confessions 
-            SET status = %s 
-            WHERE confession_id = %s
-        """, (update.status, confession_id))
-        connection.commit()
+        couple = None
+        created = False
         
         # 수락된 경우 커플 생성
         if update.status == 'accepted':
-            from_user_id = confession[1]
-            to_user_id = confession[2]
-            
-            # 궁합 점수 계산
-            cursor.execute("""
-                SELECT mbti, heart_rate, temperature 
-                FROM users WHERE user_id = %s
-            """, (from_user_id,))
-            user1 = cursor.fetchone()
-            
-            cursor.execute("""
-                SELECT mbti, heart_rate, temperature 
-                FROM users WHERE user_id = %s
-            """, (to_user_id,))
-            user2 = cursor.fetchone()
-            
-            # compatibility 함수 import
             from .compatibility import calculate_total_compatibility
             
             compatibility = calculate_total_compatibility(
-                user1[0], user2[0],
-                user1[1] or 70, user2[1] or 70,
-                user1[2] or 36.5, user2[2] or 36.5
+                confession[3], confession[8],
+                confession[4] or 70, confession[9] or 70,
+                float(confession[5]) if confession[5] is not None else 36.5,
+                float(confession[10]) if confession[10] is not None else 36.5
             )
             
-            # 커플명 기본값 설정
-            couple_name = update.couple_name
-            if not couple_name:
-                # 커플명이 없으면 자동 생성
-                cursor.execute("SELECT username FROM users WHERE user_id = %s", (from_user_id,))
-                username1 = cursor.fetchone()[0]
-                cursor.execute("SELECT username FROM users WHERE user_id = %s", (to_user_id,))
-                username2 = cursor.fetchone()[0]
-                couple_name = f"{username1} ❤️ {username2}"
+            # 커플명이 없으면 자동 생성
+            couple_name = update.couple_name or f"{confession[2]} ❤️ {confession[7]}"
             
-            # couple_ranking에 추가
-            cursor.execute("""
-                INSERT INTO couple_ranking (user_a_id, user_b_id, score, couple_name)
-                VALUES (%s, %s, %s, %s)
-            """, (
-                min(from_user_id, to_user_id), 
-                max(from_user_id, to_user_id), 
+            couple_id, score, couple_name, created = insert_couple_once(
+                cursor,
+                min(from_user_id, to_user_id),
+                max(from_user_id, to_user_id),
                 compatibility['total_score'],
                 couple_name
-            ))
-            connection.commit()
-        
-        # 업데이트된 고백 조회
-        cursor.execute("""
-            SELECT c.confession_id, c.from_user_id, u1.username as from_username,
-                   c.to_user_id, u2.username as to_username, c.status, c.message, c.created_at
-            FROM confessions c
-            JOIN users u1 ON c.from_user_id = u1.user_id
-            JOIN users u2 ON c.to_user_id = u2.user_id
-            WHERE c.confession_id = %s
-        """, (confession_id,))
+            )
+            couple = {
+                "couple_id": couple_id,
+                "user_a_id": min(from_user_id, to_user_id),
+                "user_b_id": max(from_user_id, to_user_id),
+                "score": float(score),
+                "couple_name": couple_name,
+                "created": created
+            }
         
-        result = cursor.fetchone()
+        connection.commit()
         cursor.close()
         
-        return {
+        if created:
+            leaderboard.upsert(couple["couple_id"], 0, 0, couple["score"])
+        publish_confession_event("status_changed", confession_id, from_user_id, to_user_id, update.status)
+        
+        response = {
             "success": True,
             "message": f"고백이 {update.status}(으)로 업데이트되었습니다",
             "confession": {
-                "confession_id": result[0],
-                "from_user_id": result[1],
-                "from_username": result[2],
-                "to_user_id": result[3],
-                "to_username": result[4],
-                "status": result[5],
-                "message": result[6],
-                "created_at": result[7].isoformat() if result[7] else None
+                "confession_id": confession[0],
+                "from_user_id": from_user_id,
+                "from_username": confession[2],
+                "to_user_id": to_user_id,
+                "to_username": confession[7],
+                "status": update.status,
+                "message": confession[11],
+                "created_at": confession[12].isoformat() if confession[12] else None
             }
         }
+        if couple:
+            response["couple"] = couple
+        return response
         
     except HTTPException:
         raise
@@ -311,13 +497,15 @@ def delete_confession(confession_id: int, connection = Depends(get_db)):
         cursor = connection.cursor()
         
         cursor.execute("SELECT * FROM confessions WHERE confession_id = %s", (confession_id,))
-        if not cursor.fetchone():
+        confession = cursor.fetchone()
+        if not confession:
             cursor.close()
             raise HTTPException(status_code=404, detail="고백을 찾을 수 없습니다")
         
         cursor.execute("DELETE FROM confessions WHERE confession_id = %s", (confession_id,))
         connection.commit()
         cursor.close()
+        publish_confession_event("deleted", confession_id, confession[1], confession[2])
         
         return {
             "success": True,
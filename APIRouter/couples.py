@@ -1,6 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
+from datetime import datetime, timedelta
+import asyncio
+import itertools
+from .leaderboard import leaderboard, ranking_page_cache
+from .leaderboard_feed import leaderboard_feed
+from .pubsub import forward_to_websocket
+from .schema import schema, rating_aggregate_sql
+from .db_errors import is_duplicate_entry
+from .user_loader import UserLoader
+from .export import export_response
+from .snapshots import load_snapshot_at, load_snapshots_between
+from .pagination import DEFAULT_PAGE_SIZE, clamp_limit, decode_cursor, next_cursor
 
 router = APIRouter(prefix="/api/couples", tags=["couples"])
 
@@ -14,6 +26,14 @@ class RatingCreate(BaseModel):
     comment: Optional[str] = None
     nickname: Optional[str] = "익명"
 
+class BatchRatingItem(RatingCreate):
+    couple_id: int
+
+class BatchRatingCreate(BaseModel):
+    ratings: List[BatchRatingItem]
+
+MAX_BATCH_RATINGS = 1000
+
 def get_db():
     from config import engine
     connection = engine.raw_connection()
@@ -23,143 +43,353 @@ def get_db():
         connection.close()
 
 
+def couple_columns() -> str:
+    """커플 조회 컬럼 (average_rating, rating_count는 12, 13번째, schema가 로드된 뒤 호출)"""
+    return f"""
+        cr.couple_id,
+        cr.user_a_id,
+        u1.username,
+        u1.mbti,
+        u1.profile_image_url,
+        cr.user_b_id,
+        u2.username,
+        u2.mbti,
+        u2.profile_image_url,
+        cr.score,
+        cr.couple_name,
+        cr.created_at,
+        {rating_aggregate_sql("cr")}
+    """
+
+
+def insert_couple(cursor, user_a_id: int, user_b_id: int, score, couple_name: str):
+    """couple_ranking에 커플 추가 (base_score 컬럼이 있으면 궁합 점수를 함께 저장)"""
+    schema.ensure_loaded(cursor)
+    if schema.has_column("couple_ranking", "base_score"):
+        cursor.execute("""
+            INSERT INTO couple_ranking (user_a_id, user_b_id, score, base_score, couple_name)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (user_a_id, user_b_id, score, score, couple_name))
+    else:
+        cursor.execute("""
+            INSERT INTO couple_ranking (user_a_id, user_b_id, score, couple_name)
+            VALUES (%s, %s, %s, %s)
+        """, (user_a_id, user_b_id, score, couple_name))
+
+
+def format_couple(couple) -> dict:
+    """couple_columns() 순서의 행 → 응답 형식 (couple_id, rank 제외)"""
+    return {
+        "user_a": {
+            "user_id": couple[1],
+            "username": couple[2],
+            "mbti": couple[3],
+            "profile_image_url": couple[4]
+        },
+        "user_b": {
+            "user_id": couple[5],
+            "username": couple[6],
+            "mbti": couple[7],
+            "profile_image_url": couple[8]
+        },
+        "score": float(couple[9]) if couple[9] is not None else 0.0,
+        "couple_name": couple[10],
+        "average_rating": round(float(couple[12]), 2) if couple[12] else 0.0,
+        "rating_count": int(couple[13]) if couple[13] else 0,
+        "created_at": couple[11].isoformat() if couple[11] else None
+    }
+
+
+def fetch_couples(cursor, couple_ids) -> dict:
+    """couple_id 목록을 한 번에 조회해 {couple_id: format_couple 결과} 반환"""
+    if not couple_ids:
+        return {}
+    schema.ensure_loaded(cursor)
+    placeholders = ','.join(['%s'] * len(couple_ids))
+    cursor.execute(f"""
+        SELECT {couple_columns()}
+        FROM couple_ranking cr
+        JOIN users u1 ON cr.user_a_id = u1.user_id
+        JOIN users u2 ON cr.user_b_id = u2.user_id
+        WHERE cr.couple_id IN ({placeholders})
+    """, list(couple_ids))
+    return {row[0]: format_couple(row) for row in cursor.fetchall()}
+
+
+# 랭킹은 자주 바뀌므로 매번 ETag로 재검증
+RANKING_CACHE_CONTROL = "no-cache"
+
+
 @router.get("/ranking")
 def get_couple_ranking(
+    request: Request,
     limit: int = 10,
     offset: int = 0,
     connection = Depends(get_db)
 ):
-    """커플 랭킹 조회"""
+    """
+    커플 랭킹 조회
+    
+    페이지는 직렬화된 상태로 캐시되고 커플 생성/별점/고백 수락 시 무효화됨
+    ETag로 If-None-Match 재검증 가능 (변경 없으면 304)
+    """
+    limit = clamp_limit(limit)
+    offset = max(0, offset)
+    cached = ranking_page_cache.get(limit, offset)
+    if cached and leaderboard.loaded:
+        return cached.response(request, RANKING_CACHE_CONTROL)
+    
     try:
+        version = ranking_page_cache.version
         cursor = connection.cursor()
         
-        cursor.execute("SELECT COUNT(*) FROM couple_ranking")
-        total_count = cursor.fetchone()[0]
+        # 순위는 메모리 랭킹에서 O(log n)으로 구하고, 해당 커플 행만 PK로 조회
+        leaderboard.ensure_loaded(cursor)
+        total_count = len(leaderboard)
+        page = leaderboard.page(limit, offset)
+        couples = fetch_couples(cursor, [couple_id for _, couple_id in page])
         
-        cursor.execute("""
-            SELECT COUNT(*) 
-            FROM information_schema.tables 
-            WHERE table_schema = DATABASE()
-            AND table_name = 'couple_ratings'
-        """)
-        has_ratings = cursor.fetchone()[0] > 0
+        ranking = []
+        for rank, couple_id in page:
+            couple = couples.get(couple_id)
+            if couple:
+                ranking.append({"couple_id": couple_id, "rank": rank, **couple})
         
-        if has_ratings:
-            query = """
-                SELECT 
-                    cr.couple_id,
-                    cr.user_a_id,
-                    u1.username,
-                    u1.mbti,
-                    u1.profile_image_url,
-                    cr.user_b_id,
-                    u2.username,
-                    u2.mbti,
-                    u2.profile_image_url,
-                    cr.score,
-                    cr.couple_name,
-                    cr.created_at,
-                    COALESCE(AVG(ratings.rating), 0) as average_rating,
-                    COUNT(ratings.rating_id) as rating_count
-                FROM couple_ranking cr
-                JOIN users u1 ON cr.user_a_id = u1.user_id
-                JOIN users u2 ON cr.user_b_id = u2.user_id
-                LEFT JOIN couple_ratings ratings ON cr.couple_id = ratings.couple_id
-                GROUP BY cr.couple_id, cr.user_a_id, u1.username, u1.mbti, u1.profile_image_url,
-                         cr.user_b_id, u2.username, u2.mbti, u2.profile_image_url,
-                         cr.score, cr.couple_name, cr.created_at
-                ORDER BY average_rating DESC, rating_count DESC, cr.score DESC
-                LIMIT %s OFFSET %s
-            """
-        else:
-            query = """
-                SELECT 
-                    cr.couple_id,
-                    cr.user_a_id,
-                    u1.username,
-                    u1.mbti,
-                    u1.profile_image_url,
-                    cr.user_b_id,
-                    u2.username,
-                    u2.mbti,
-                    u2.profile_image_url,
-                    cr.score,
-                    cr.couple_name,
-                    cr.created_at,
-                    0 as average_rating,
-                    0 as rating_count
-                FROM couple_ranking cr
-                JOIN users u1 ON cr.user_a_id = u1.user_id
-                JOIN users u2 ON cr.user_b_id = u2.user_id
-                ORDER BY cr.score DESC
-                LIMIT %s OFFSET %s
-            """
+        cursor.close()
         
-        cursor.execute(query, (limit, offset))
-        couples = cursor.fetchall()
+        entry = ranking_page_cache.put(limit, offset, {
+            "count": total_count,
+            "limit": limit,
+            "offset": offset,
+            "ranking": ranking
+        }, version)
+        return entry.response(request, RANKING_CACHE_CONTROL)
+        
+    except Exception as e:
+        import traceback
+        print("=" * 60)
+        print("커플 랭킹 조회 오류:")
+        print(traceback.format_exc())
+        print("=" * 60)
+        raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+
+
+RANKING_EXPORT_COLUMNS = [
+    "rank", "couple_id", "couple_name", "score", "average_rating", "rating_count",
+    "user_a_id", "user_a_name", "user_b_id", "user_b_name"
+]
+
+
+@router.get("/ranking/export")
+def export_couple_ranking(format: str = "ndjson"):
+    """커플 랭킹 전체 내보내기 (NDJSON/CSV 스트리밍, 정렬은 랭킹 인덱스 순서)"""
+    if not schema.loaded:
+        try:
+            schema.refresh_from_db()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+    
+    ranks = itertools.count(1)
+    return export_response(f"""
+        SELECT cr.couple_id, cr.couple_name, cr.score, {rating_aggregate_sql("cr")},
+               cr.user_a_id, u1.username, cr.user_b_id, u2.username
+        FROM couple_ranking cr
+        JOIN users u1 ON cr.user_a_id = u1.user_id
+        JOIN users u2 ON cr.user_b_id = u2.user_id
+        ORDER BY average_rating DESC, rating_count DESC, cr.score DESC, cr.couple_id
+    """, (), RANKING_EXPORT_COLUMNS, format, "couple_ranking",
+        transform=lambda row: (next(ranks),) + tuple(row))
+
+
+@router.websocket("/ws/ranking")
+async def websocket_couple_ranking(websocket: WebSocket):
+    """
+    실시간 커플 랭킹
+    
+    연결 시 상위 팀 전체(snapshot)를 보내고, 이후에는 바뀐 팀만(diff) 전송
+    resync를 받으면 다시 연결해 snapshot부터 받으면 됨
+    """
+    await websocket.accept()
+    
+    if not leaderboard.loaded:
+        try:
+            await asyncio.to_thread(leaderboard.load_from_db)
+        except Exception as e:
+            await websocket.send_json({"type": "error", "message": f"데이터베이스 오류: {str(e)}"})
+            await websocket.close()
+            return
+    
+    queue, snapshot = leaderboard_feed.subscribe()
+    try:
+        await websocket.send_json(snapshot)
+        await forward_to_websocket(websocket, queue)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        leaderboard_feed.unsubscribe(queue)
+
+
+def require_snapshots(cursor):
+    schema.ensure_loaded(cursor)
+    if not schema.has_table("leaderboard_snapshots"):
+        cursor.close()
+        raise HTTPException(
+            status_code=501,
+            detail="랭킹 기록을 사용하려면 leaderboard_snapshots 테이블을 먼저 생성해야 합니다."
+        )
+
+
+MAX_RANK_HISTORY = 500
+
+
+@router.get("/ranking/history")
+def get_couple_ranking_at(
+    at: Optional[datetime] = None,
+    limit: int = 10,
+    connection = Depends(get_db)
+):
+    """특정 시각의 상위 limit팀 (그 시각 이전의 가장 최근 스냅샷 기준)"""
+    try:
+        cursor = connection.cursor()
+        require_snapshots(cursor)
+        
+        snapshot = load_snapshot_at(cursor, at or datetime.now())
+        if not snapshot:
+            cursor.close()
+            raise HTTPException(status_code=404, detail="해당 시각의 랭킹 기록이 없습니다")
+        
+        top = snapshot.top(max(0, limit))
+        couples = fetch_couples(cursor, [couple_id for _, couple_id, _ in top])
+        cursor.close()
         
         ranking = []
-        for idx, couple in enumerate(couples, start=offset + 1):
+        for rank, couple_id, score in top:
+            couple = couples.get(couple_id, {})
             ranking.append({
-                "couple_id": couple[0],
-                "rank": idx,
-                "user_a": {
-                    "user_id": couple[1],
-                    "username": couple[2],
-                    "mbti": couple[3],
-                    "profile_image_url": couple[4]
-                },
-                "user_b": {
-                    "user_id": couple[5],
-                    "username": couple[6],
-                    "mbti": couple[7],
-                    "profile_image_url": couple[8]
-                },
-                "score": float(couple[9]) if couple[9] is not None else 0.0,
-                "couple_name": couple[10],
-                "average_rating": round(float(couple[12]), 2) if couple[12] else 0.0,
-                "rating_count": int(couple[13]) if couple[13] else 0,
-                "created_at": couple[11].isoformat() if couple[11] else None
+                "couple_id": couple_id,
+                "rank": rank,
+                "score": score,
+                "couple_name": couple.get("couple_name")
             })
         
+        return {
+            "taken_at": snapshot.taken_at.isoformat(),
+            "count": len(snapshot.couple_ids),
+            "ranking": ranking
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+
+
+@router.get("/{couple_id}/rank-history")
+def get_couple_rank_history(
+    couple_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+    connection = Depends(get_db)
+):
+    """커플의 시간별 순위/점수 (기본: 최근 24시간, 구간이 길면 가장 최근 limit개)"""
+    until = until or datetime.now()
+    since = since or until - timedelta(days=1)
+    
+    try:
+        cursor = connection.cursor()
+        require_snapshots(cursor)
+        
+        snapshots = load_snapshots_between(cursor, since, until, max(1, min(limit, MAX_RANK_HISTORY)))
         cursor.close()
         
+        history = []
+        for snapshot in snapshots:
+            found = snapshot.rank_of(couple_id)
+            if found:
+                history.append({
+                    "taken_at": snapshot.taken_at.isoformat(),
+                    "rank": found[0],
+                    "score": found[1],
+                    "count": len(snapshot.couple_ids)
+                })
+        
         return {
-            "count": total_count,
-            "limit": limit,
-            "offset": offset,
+            "couple_id": couple_id,
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "history": history
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+
+
+@router.get("/{couple_id}/around")
+def get_couple_ranking_around(
+    couple_id: int,
+    above: int = 2,
+    below: int = 2,
+    connection = Depends(get_db)
+):
+    """특정 커플 바로 위/아래 순위의 커플 조회"""
+    try:
+        cursor = connection.cursor()
+        leaderboard.ensure_loaded(cursor)
+        
+        around = leaderboard.around(couple_id, max(0, above), max(0, below))
+        if around is None:
+            cursor.close()
+            raise HTTPException(status_code=404, detail="커플을 찾을 수 없습니다")
+        
+        couples = fetch_couples(cursor, [cid for _, cid in around])
+        cursor.close()
+        
+        ranking = []
+        for rank, cid in around:
+            couple = couples.get(cid)
+            if couple:
+                ranking.append({"couple_id": cid, "rank": rank, "is_me": cid == couple_id, **couple})
+        
+        return {
+            "couple_id": couple_id,
+            "rank": leaderboard.rank(couple_id),
+            "count": len(leaderboard),
             "ranking": ranking
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print("=" * 60)
-        print("커플 랭킹 조회 오류:")
+        print("주변 순위 조회 오류:")
         print(traceback.format_exc())
         print("=" * 60)
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
 
 
 @router.get("/{couple_id}")
-def get_couple_detail(couple_id: int, connection = Depends(get_db)):
-    """커플 상세 정보 조회"""
+def get_couple_detail(
+    couple_id: int,
+    ratings_limit: int = DEFAULT_PAGE_SIZE,
+    ratings_cursor: Optional[str] = None,
+    connection = Depends(get_db)
+):
+    """
+    커플 상세 정보 조회
+    
+    별점 목록은 최신순으로 ratings_limit개씩 반환
+    다음 페이지는 응답의 ratings_next_cursor를 ratings_cursor로 전달
+    """
     try:
         cursor = connection.cursor()
+        schema.ensure_loaded(cursor)
         
-        cursor.execute("""
-            SELECT 
-                cr.couple_id,
-                cr.user_a_id,
-                u1.username,
-                u1.mbti,
-                u1.profile_image_url,
-                cr.user_b_id,
-                u2.username,
-                u2.mbti,
-                u2.profile_image_url,
-                cr.score,
-                cr.couple_name,
-                cr.created_at
+        cursor.execute(f"""
+            SELECT {couple_columns()}
             FROM couple_ranking cr
             JOIN users u1 ON cr.user_a_id = u1.user_id
             JOIN users u2 ON cr.user_b_id = u2.user_id
@@ -172,48 +402,44 @@ def get_couple_detail(couple_id: int, connection = Depends(get_db)):
             cursor.close()
             raise HTTPException(status_code=404, detail="커플을 찾을 수 없습니다")
         
-        current_score = couple[9] if couple[9] is not None else 0
-        cursor.execute("""
-            SELECT COUNT(*) + 1 FROM couple_ranking 
-            WHERE score > %s
-        """, (current_score,))
-        rank = cursor.fetchone()[0]
+        # 순위는 메모리 랭킹에서 조회 (랭킹은 쓰기 경로에서만 갱신)
+        leaderboard.ensure_loaded(cursor)
+        rank = leaderboard.rank(couple_id)
         
-        cursor.execute("""
-            SELECT COUNT(*) 
-            FROM information_schema.tables 
-            WHERE table_schema = DATABASE()
-            AND table_name = 'couple_ratings'
-        """)
-        has_ratings = cursor.fetchone()[0] > 0
-        
-        average_rating = 0.0
-        rating_count = 0
+        schema.ensure_loaded(cursor)
+        has_ratings = schema.has_table("couple_ratings")
+        
+        # 평균/개수는 별점 등록 시 누적해 둔 값을 그대로 사용
+        average_rating = round(float(couple[12]), 2) if couple[12] else 0.0
+        rating_count = int(couple[13] or 0)
         ratings_list = []
+        ratings_next_cursor = None
         
         if has_ratings:
             try:
-                cursor.execute("""
-                    SELECT AVG(rating), COUNT(*) 
-                    FROM couple_ratings 
-                    WHERE couple_id = %s
-                """, (couple_id,))
-                avg_result = cursor.fetchone()
-                average_rating = round(float(avg_result[0]), 2) if avg_result[0] else 0.0
-                rating_count = int(avg_result[1]) if avg_result[1] else 0
+                ratings_limit = clamp_limit(ratings_limit)
+                params = [couple_id]
+                keyset = ""
+                if ratings_cursor:
+                    before_created_at, before_rating_id = decode_cursor(ratings_cursor)
+                    keyset = "AND (cr.created_at < %s OR (cr.created_at = %s AND cr.rating_id < %s))"
+                    params += [before_created_at, before_created_at, before_rating_id]
+                params.append(ratings_limit + 1)
                 
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT 
                         cr.rating,
                         cr.comment,
                         cr.created_at,
-                        cr.nickname
+                        cr.nickname,
+                        cr.rating_id
                     FROM couple_ratings cr
-                    WHERE cr.couple_id = %s
-                    ORDER BY cr.created_at DESC
-                """, (couple_id,))
+                    WHERE cr.couple_id = %s {keyset}
+                    ORDER BY cr.created_at DESC, cr.rating_id DESC
+                    LIMIT %s
+                """, params)
                 
-                ratings = cursor.fetchall()
+                ratings, ratings_next_cursor = next_cursor(cursor.fetchall(), ratings_limit, 2, 4)
                 for rating in ratings:
                     ratings_list.append({
                         "rating": rating[0],
@@ -221,6 +447,9 @@ def get_couple_detail(couple_id: int, connection = Depends(get_db)):
                         "created_at": rating[2].isoformat() if rating[2] else None,
                         "nickname": rating[3] if rating[3] else "익명"
                     })
+            except HTTPException:
+                cursor.close()
+                raise
             except Exception as rating_error:
                 print(f"⚠️ 별점 조회 중 오류: {rating_error}")
                 import traceback
@@ -248,7 +477,8 @@ def get_couple_detail(couple_id: int, connection = Depends(get_db)):
             "average_rating": average_rating,
             "rating_count": rating_count,
             "created_at": couple[11].isoformat() if couple[11] else None,
-            "ratings_list": ratings_list
+            "ratings_list": ratings_list,
+            "ratings_next_cursor": ratings_next_cursor
         }
         
     except HTTPException:
@@ -262,6 +492,40 @@ def get_couple_detail(couple_id: int, connection = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
 
 
+def score_base_column() -> str:
+    """점수 재계산 기준 (003_couple_base_score 전이면 예전처럼 현재 점수)"""
+    return "base_score" if schema.has_column("couple_ranking", "base_score") else "score"
+
+
+def apply_ratings_query() -> str:
+    """
+    별점 반영: 합계/개수를 누적하고 점수를 원래 궁합 점수(base_score) 기준으로 다시 계산
+
+    MySQL UPDATE는 SET을 왼쪽부터 적용하므로 score 계산에는 갱신된 합계/개수가 쓰임
+    파라미터: (rating_sum, rating_count, couple_id)
+    """
+    return f"""
+        UPDATE couple_ranking
+        SET rating_sum = rating_sum + %s,
+            rating_count = rating_count + %s,
+            score = {score_base_column()} * 0.8 + (rating_sum / rating_count) * 4
+        WHERE couple_id = %s
+    """
+
+
+def recompute_score_query() -> str:
+    """
+    002_couple_rating_aggregates 전의 점수 재계산 (별점을 넣은 뒤 전체 평균으로)
+
+    파라미터: (couple_id, couple_id)
+    """
+    return f"""
+        UPDATE couple_ranking
+        SET score = {score_base_column()} * 0.8 + (SELECT AVG(rating) FROM couple_ratings WHERE couple_id = %s) * 4
+        WHERE couple_id = %s
+    """
+
+
 @router.put("/{couple_id}/rating")
 def add_couple_rating(
     couple_id: int,
@@ -272,60 +536,47 @@ def add_couple_rating(
     try:
         cursor = connection.cursor()
         
-        cursor.execute("""
-            SELECT COUNT(*) 
-            FROM information_schema.tables 
-            WHERE table_schema = DATABASE()
-            AND table_name = 'couple_ratings'
-        """)
+        schema.ensure_loaded(cursor)
         
-        if cursor.fetchone()[0] == 0:
+        if not schema.has_table("couple_ratings"):
             cursor.close()
             raise HTTPException(
                 status_code=501, 
                 detail="별점 기능을 사용하려면 couple_ratings 테이블을 먼저 생성해야 합니다."
             )
         
-        cursor.execute("SELECT couple_id, score FROM couple_ranking WHERE couple_id = %s", (couple_id,))
-        couple = cursor.fetchone()
-        
-        if not couple:
-            cursor.close()
-            raise HTTPException(status_code=404, detail="커플을 찾을 수 없습니다")
-        
         if rating_data.rating < 1 or rating_data.rating > 5:
             cursor.close()
             raise HTTPException(status_code=400, detail="별점은 1~5 사이여야 합니다")
         
+        has_aggregates = schema.has_column("couple_ranking", "rating_sum")
+        
+        if has_aggregates:
+            # 합계/개수 증가와 점수 재계산을 한 문장으로 (행 잠금은 UPDATE가 처리)
+            cursor.execute(apply_ratings_query(), (rating_data.rating, 1, couple_id))
+            found = cursor.rowcount > 0
+        else:
+            cursor.execute("SELECT couple_id FROM couple_ranking WHERE couple_id = %s FOR UPDATE", (couple_id,))
+            found = cursor.fetchone() is not None
+        
+        if not found:
+            connection.rollback()
+            cursor.close()
+            raise HTTPException(status_code=404, detail="커플을 찾을 수 없습니다")
+        
         cursor.execute("""
             INSERT INTO couple_ratings (couple_id, rating, comment, nickname)
             VALUES (%s, %s, %s, %s)
         """, (couple_id, rating_data.rating, rating_data.comment, rating_data.nickname))
         
-        cursor.execute("""
-            SELECT AVG(rating) FROM couple_ratings WHERE couple_id = %s
-        """, (couple_id,))
-        average_rating = cursor.fetchone()[0] or 0
-        
-        base_score = float(couple[1])
-        rating_bonus = float(average_rating) * 4
-        new_score = (base_score * 0.8) + rating_bonus
-        
-        cursor.execute("""
-            UPDATE couple_ranking 
-            SET score = %s
-            WHERE couple_id = %s
-        """, (new_score, couple_id))
+        if not has_aggregates:
+            cursor.execute(recompute_score_query(), (couple_id, couple_id))
         
         connection.commit()
         
-        cursor.execute("""
-            SELECT COUNT(*) + 1 FROM couple_ranking WHERE score > %s
-        """, (new_score,))
-        current_rank = cursor.fetchone()[0]
-        
-        cursor.execute("""
-            SELECT cr.user_a_id, u1.username, cr.user_b_id, u2.username
+        cursor.execute(f"""
+            SELECT cr.user_a_id, u1.username, cr.user_b_id, u2.username,
+                   cr.score, {rating_aggregate_sql("cr")}
             FROM couple_ranking cr
             JOIN users u1 ON cr.user_a_id = u1.user_id
             JOIN users u2 ON cr.user_b_id = u2.user_id
@@ -333,11 +584,29 @@ def add_couple_rating(
         """, (couple_id,))
         couple_info = cursor.fetchone()
         
+        if not couple_info:
+            # 커밋 후 다시 읽기 전에 커플이 삭제된 경우 (별점은 저장됨)
+            cursor.close()
+            return {
+                "success": True,
+                "message": f"별점 {rating_data.rating}점이 반영되었습니다",
+                "submitted_rating": rating_data.rating,
+                "submitted_comment": rating_data.comment,
+                "couple": None
+            }
+        
+        new_score = couple_info[4]
+        average_rating = couple_info[5]
+        
+        leaderboard.ensure_loaded(cursor)
+        leaderboard.upsert(couple_id, average_rating, couple_info[6], new_score)
+        current_rank = leaderboard.rank(couple_id)
+        
         cursor.close()
         
         return {
             "success": True,
-            "message": f"별점 {rating_data.rating}점이 반영되었습니다. 현재 평균: {average_rating:.2f}점",
+            "message": f"별점 {rating_data.rating}점이 반영되었습니다. 현재 평균: {float(average_rating):.2f}점",
             "submitted_rating": rating_data.rating,
             "submitted_comment": rating_data.comment,
             "couple": {
@@ -368,19 +637,143 @@ def add_couple_rating(
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
 
 
+@router.post("/ratings/batch")
+def add_couple_ratings_batch(batch: BatchRatingCreate, connection = Depends(get_db)):
+    """
+    여러 커플의 별점을 한 번에 등록
+    
+    잘못된 별점이나 없는 커플은 해당 항목만 error로 표시하고 나머지는 반영
+    별점은 executemany로 넣고, 커플별 합계/개수/점수는 커플당 UPDATE 한 번, 커밋은 한 번
+    """
+    if len(batch.ratings) > MAX_BATCH_RATINGS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {MAX_BATCH_RATINGS}개까지 등록할 수 있습니다")
+    
+    try:
+        cursor = connection.cursor()
+        
+        schema.ensure_loaded(cursor)
+        
+        if not schema.has_table("couple_ratings"):
+            cursor.close()
+            raise HTTPException(
+                status_code=501, 
+                detail="별점 기능을 사용하려면 couple_ratings 테이블을 먼저 생성해야 합니다."
+            )
+        
+        results = []
+        for index, item in enumerate(batch.ratings):
+            result = {"index": index, "couple_id": item.couple_id, "rating": item.rating}
+            if item.rating < 1 or item.rating > 5:
+                result["error"] = "별점은 1~5 사이여야 합니다"
+            results.append(result)
+        
+        couple_ids = sorted({
+            item.couple_id
+            for item, result in zip(batch.ratings, results)
+            if "error" not in result
+        })
+        
+        existing = set()
+        if couple_ids:
+            # 커플 행을 id 순서로 잠가 동시 배치끼리의 교착을 피함
+            placeholders = ','.join(['%s'] * len(couple_ids))
+            cursor.execute(f"""
+                SELECT couple_id FROM couple_ranking
+                WHERE couple_id IN ({placeholders})
+                ORDER BY couple_id
+                FOR UPDATE
+            """, couple_ids)
+            existing = {row[0] for row in cursor.fetchall()}
+        
+        rows = []
+        totals = {}
+        for item, result in zip(batch.ratings, results):
+            if "error" in result:
+                continue
+            if item.couple_id not in existing:
+                result["error"] = "커플을 찾을 수 없습니다"
+                continue
+            rows.append((item.couple_id, item.rating, item.comment, item.nickname))
+            rating_sum, rating_count = totals.get(item.couple_id, (0, 0))
+            totals[item.couple_id] = (rating_sum + item.rating, rating_count + 1)
+        
+        couples = {}
+        if rows:
+            cursor.executemany("""
+                INSERT INTO couple_ratings (couple_id, rating, comment, nickname)
+                VALUES (%s, %s, %s, %s)
+            """, rows)
+            if schema.has_column("couple_ranking", "rating_sum"):
+                cursor.executemany(apply_ratings_query(), [
+                    (rating_sum, rating_count, couple_id)
+                    for couple_id, (rating_sum, rating_count) in sorted(totals.items())
+                ])
+            else:
+                cursor.executemany(recompute_score_query(), [
+                    (couple_id, couple_id) for couple_id in sorted(totals)
+                ])
+            connection.commit()
+            
+            placeholders = ','.join(['%s'] * len(totals))
+            cursor.execute(f"""
+                SELECT cr.couple_id, cr.score, {rating_aggregate_sql("cr")}
+                FROM couple_ranking cr
+                WHERE cr.couple_id IN ({placeholders})
+            """, list(totals))
+            
+            leaderboard.ensure_loaded(cursor)
+            for row in cursor.fetchall():
+                leaderboard.upsert(row[0], row[2], row[3], row[1])
+                couples[row[0]] = {
+                    "couple_id": row[0],
+                    "average_rating": round(float(row[2]), 2),
+                    "rating_count": row[3],
+                    "score": round(float(row[1]), 2)
+                }
+            for couple in couples.values():
+                couple["rank"] = leaderboard.rank(couple["couple_id"])
+        else:
+            connection.rollback()
+        
+        cursor.close()
+        
+        for result in results:
+            result["success"] = "error" not in result
+            if result["success"]:
+                # 커밋 후 다시 읽기 전에 커플이 삭제됐으면 순위 없이 반환 (별점은 저장됨)
+                couple = couples.get(result["couple_id"])
+                result["rank"] = couple["rank"] if couple else None
+        
+        return {
+            "success": True,
+            "accepted": len(rows),
+            "rejected": len(results) - len(rows),
+            "results": results,
+            "couples": list(couples.values())
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        connection.rollback()
+        raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+
+
 @router.post("")
 def create_couple(couple: CoupleCreate, connection = Depends(get_db)):
     """커플 등록"""
     try:
         cursor = connection.cursor()
         
-        cursor.execute("SELECT user_id FROM users WHERE user_id = %s", (couple.user_a_id,))
-        if not cursor.fetchone():
+        users = UserLoader(connection).load_many([couple.user_a_id, couple.user_b_id])
+        user_a = users.get(couple.user_a_id)
+        user_b = users.get(couple.user_b_id)
+        
+        if not user_a:
             cursor.close()
             raise HTTPException(status_code=404, detail="user_a를 찾을 수 없습니다")
         
-        cursor.execute("SELECT user_id FROM users WHERE user_id = %s", (couple.user_b_id,))
-        if not cursor.fetchone():
+        if not user_b:
             cursor.close()
             raise HTTPException(status_code=404, detail="user_b를 찾을 수 없습니다")
         
@@ -388,51 +781,44 @@ def create_couple(couple: CoupleCreate, connection = Depends(get_db)):
             cursor.close()
             raise HTTPException(status_code=400, detail="같은 사용자끼리 커플이 될 수 없습니다")
         
-        cursor.execute("""
-            SELECT couple_id FROM couple_ranking 
-            WHERE (user_a_id = %s AND user_b_id = %s) 
-               OR (user_a_id = %s AND user_b_id = %s)
-        """, (couple.user_a_id, couple.user_b_id, couple.user_b_id, couple.user_a_id))
-        
-        if cursor.fetchone():
-            cursor.close()
-            raise HTTPException(status_code=400, detail="이미 커플로 등록되어 있습니다")
-        
-        cursor.execute("""
-            SELECT mbti, heart_rate, temperature 
-            FROM users WHERE user_id = %s
-        """, (couple.user_a_id,))
-        user_a = cursor.fetchone()
-        
-        cursor.execute("""
-            SELECT mbti, heart_rate, temperature 
-            FROM users WHERE user_id = %s
-        """, (couple.user_b_id,))
-        user_b = cursor.fetchone()
-        
         from .compatibility import calculate_total_compatibility
         
         compatibility = calculate_total_compatibility(
-            user_a[0], user_b[0],
-            user_a[1] or 70, user_b[1] or 70,
-            user_a[2] or 36.5, user_b[2] or 36.5
+            user_a["mbti"], user_b["mbti"],
+            user_a["heart_rate"] or 70, user_b["heart_rate"] or 70,
+            float(user_a["temperature"]) if user_a["temperature"] is not None else 36.5,
+            float(user_b["temperature"]) if user_b["temperature"] is not None else 36.5
         )
         
         couple_name = couple.couple_name
         if not couple_name:
-            cursor.execute("SELECT username FROM users WHERE user_id = %s", (couple.user_a_id,))
-            username_a = cursor.fetchone()[0]
-            cursor.execute("SELECT username FROM users WHERE user_id = %s", (couple.user_b_id,))
-            username_b = cursor.fetchone()[0]
-            couple_name = f"{username_a} ❤️ {username_b}"
+            couple_name = f"{user_a['username']} ❤️ {user_b['username']}"
         
         user_a_id = min(couple.user_a_id, couple.user_b_id)
         user_b_id = max(couple.user_a_id, couple.user_b_id)
         
-        cursor.execute("""
-            INSERT INTO couple_ranking (user_a_id, user_b_id, score, couple_name)
-            VALUES (%s, %s, %s, %s)
-        """, (user_a_id, user_b_id, compatibility['total_score'], couple_name))
+        # 007_pair_unique_keys 전이면 인덱스 대신 직접 확인
+        schema.ensure_loaded(cursor)
+        if not schema.has_index("couple_ranking", "uq_couple_ranking_pair"):
+            cursor.execute("""
+                SELECT couple_id FROM couple_ranking 
+                WHERE (user_a_id = %s AND user_b_id = %s) 
+                   OR (user_a_id = %s AND user_b_id = %s)
+            """, (user_a_id, user_b_id, user_b_id, user_a_id))
+            
+            if cursor.fetchone():
+                cursor.close()
+                raise HTTPException(status_code=400, detail="이미 커플로 등록되어 있습니다")
+        
+        # 이미 커플이면 UNIQUE 인덱스(uq_couple_ranking_pair)가 거부
+        try:
+            insert_couple(cursor, user_a_id, user_b_id, compatibility['total_score'], couple_name)
+        except Exception as e:
+            if not is_duplicate_entry(e, "uq_couple_ranking_pair"):
+                raise
+            connection.rollback()
+            cursor.close()
+            raise HTTPException(status_code=400, detail="이미 커플로 등록되어 있습니다")
         
         connection.commit()
         couple_id = cursor.lastrowid
@@ -450,6 +836,7 @@ def create_couple(couple: CoupleCreate, connection = Depends(get_db)):
         """, (couple_id,))
         
         result = cursor.fetchone()
+        leaderboard.upsert(couple_id, 0, 0, result[9])
         cursor.close()
         
         return {
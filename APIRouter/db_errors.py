@@ -0,0 +1,13 @@
+import pymysql
+
+# MySQL ER_DUP_ENTRY (UNIQUE 인덱스 중복)
+DUPLICATE_ENTRY = 1062
+
+
+def is_duplicate_entry(error: Exception, index_name: str = None) -> bool:
+    """UNIQUE 인덱스 중복 오류인지 (index_name을 주면 해당 인덱스만)"""
+    if not isinstance(error, pymysql.err.IntegrityError):
+        return False
+    if not error.args or error.args[0] != DUPLICATE_ENTRY:
+        return False
+    return index_name is None or index_name in str(error.args[-1])
@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+import pymysql
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+EXPORT_FETCH_SIZE = 500
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_value(value):
+    """DB 값 → JSON/CSV에 쓸 수 있는 값"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def stream_rows(query, params, columns, export_format, transform=None):
+    """
+    SSCursor(서버 측 커서)로 EXPORT_FETCH_SIZE개씩 읽으며 NDJSON/CSV 줄 생성
+
+    요청 의존성(get_db)의 연결은 응답 전송 전에 닫히므로 자체 연결을 사용
+    끝까지 읽지 못하고 중단되면(클라이언트 연결 끊김) 남은 행을 받지 않고 연결을 폐기
+    """
+    from config import engine
+    connection = engine.raw_connection()
+    finished = False
+    try:
+        cursor = connection.cursor(pymysql.cursors.SSCursor)
+        cursor.execute(query, params)
+
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            values = [
+                [export_value(value) for value in (transform(row) if transform else row)]
+                for row in rows
+            ]
+            if export_format == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(values)
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+                    for row in values
+                )
+
+        cursor.close()
+        finished = True
+    finally:
+        if finished:
+            connection.close()
+        else:
+            connection.invalidate()
+
+
+def export_response(query, params, columns, export_format, filename, transform=None):
+    """stream_rows를 StreamingResponse로 (CSV는 첨부 파일로 내려받기)"""
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format은 ndjson 또는 csv여야 합니다")
+
+    headers = {}
+    if export_format == "csv":
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+
+    return StreamingResponse(
+        stream_rows(query, params, columns, export_format, transform),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers=headers
+    )
@@ -8,7 +8,11 @@ import json
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from sensors.sensor_reader import SensorManager
+from sensors.heart_sensor import SignalQualityMonitor, SignalQualityError, QUALITY_WINDOW
 from .compatibility import calculate_total_compatibility
+from .schema import schema
+from .user_loader import UserLoader
+from .user_cache import user_cache
 
 router = APIRouter(prefix="/api/fated-match", tags=["fated_match"])
 
@@ -26,6 +30,38 @@ def get_db():
         connection.close()
 
 
+def get_user_with_measurement(cursor, user_id: int):
+    """
+    사용자 이름과 마지막 측정값 조회
+
+    Returns:
+        (username, heart_rate, temperature, is_fresh) 또는 None
+        is_fresh는 last_measured_at이 MEASUREMENT_FRESHNESS_SECONDS 이내인지 여부
+    """
+    from config import MEASUREMENT_FRESHNESS_SECONDS
+
+    cursor.execute("""
+        SELECT username, heart_rate, temperature,
+               TIMESTAMPDIFF(SECOND, last_measured_at, NOW())
+        FROM users
+        WHERE user_id = %s
+    """, (user_id,))
+    user = cursor.fetchone()
+
+    if not user:
+        return None
+
+    age = user[3]
+    is_fresh = (
+        age is not None
+        and user[1] is not None
+        and user[2] is not None
+        and age <= MEASUREMENT_FRESHNESS_SECONDS
+    )
+    temperature = float(user[2]) if user[2] is not None else None
+    return user[0], user[1], temperature, is_fresh
+
+
 @router.post("/update-sensor")
 def update_sensor_data(data: SensorData, connection = Depends(get_db)):
     """센서 데이터 업데이트 (심박수, 온도)"""
@@ -43,6 +79,7 @@ def update_sensor_data(data: SensorData, connection = Depends(get_db)):
             data.user_id
         ))
         connection.commit()
+        user_cache.invalidate(data.user_id)
         cursor.close()
         
         return {
@@ -60,84 +97,221 @@ def update_sensor_data(data: SensorData, connection = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
 
 
+# calculate_total_compatibility와 같은 계산을 MySQL에서 수행
+# - 체온은 Python float와 같은 결과가 나오도록 DOUBLE(+ 0E0)로 계산
+# - MBTI 비교는 Python과 같이 대소문자 구분 (BINARY)
+# - 정렬 동점은 user_id 순 (Python 안정 정렬 + PK 순 조회와 동일)
+DB_SCORING_QUERY = """
+    SELECT user_id, username, mbti, profile_image_url,
+           mbti_score, heart_rate_score, temperature_score,
+           FLOOR(mbti_score * 0.2E0 + heart_rate_score * 0.5E0 + temperature_score * 0.3E0) AS total_score
+    FROM (
+        SELECT u.user_id, u.username, u.mbti, u.profile_image_url,
+               COALESCE(mc.score, IF(CAST(u.mbti AS BINARY) <=> CAST(%(mbti)s AS BINARY), 75, 60)) AS mbti_score,
+               CASE
+                   WHEN u.hr_diff <= 5 THEN 100
+                   WHEN u.hr_diff <= 10 THEN 85 + u.hr_diff - 5
+                   WHEN u.hr_diff <= 15 THEN 70 + u.hr_diff - 10
+                   WHEN u.hr_diff <= 20 THEN 55 + u.hr_diff - 15
+                   ELSE GREATEST(40, 100 - u.hr_diff * 2)
+               END AS heart_rate_score,
+               CASE
+                   WHEN u.temp_diff <= 0.3E0 THEN 100
+                   WHEN u.temp_diff <= 0.6E0 THEN 85
+                   WHEN u.temp_diff <= 1.0E0 THEN 70
+                   WHEN u.temp_diff <= 1.5E0 THEN 55
+                   ELSE GREATEST(40, 100 - u.temp_diff * 30)
+               END AS temperature_score
+        FROM (
+            SELECT user_id, username, mbti, profile_image_url,
+                   ABS(CAST(COALESCE(NULLIF(heart_rate, 0), 70) AS SIGNED) - %(heart_rate)s) AS hr_diff,
+                   ABS((COALESCE(temperature, 36.5) + 0E0) - %(temperature)s) AS temp_diff
+            FROM users
+            WHERE user_id != %(user_id)s
+        ) u
+        LEFT JOIN mbti_compatibility mc
+            ON mc.mbti1 = CAST(%(mbti)s AS BINARY)
+           AND mc.mbti2 = CAST(u.mbti AS BINARY)
+    ) scored
+    ORDER BY total_score DESC, user_id
+"""
+
+
+def score_candidates_in_db(cursor, user_id: int, mbti, heart_rate: int, temperature: float, limit=None):
+    """
+    DB에서 궁합 점수를 계산해 상위 limit명만 조회 (limit이 None이면 전체)
+    
+    Returns:
+        get_fated_matches의 fated_matches 항목과 같은 형식의 리스트
+    """
+    query = DB_SCORING_QUERY
+    params = {
+        "user_id": user_id,
+        "mbti": mbti,
+        "heart_rate": int(heart_rate),
+        "temperature": float(temperature)
+    }
+    if limit is not None:
+        query += " LIMIT %(limit)s"
+        params["limit"] = limit
+    
+    cursor.execute(query, params)
+    
+    return [
+        {
+            "user_id": row[0],
+            "username": row[1],
+            "mbti": row[2],
+            "profile_image_url": row[3],
+            "compatibility_score": int(row[7]),
+            "mbti_score": int(row[4]),
+            "heart_rate_score": int(row[5]),
+            "temperature_score": int(row[6])
+        }
+        for row in cursor.fetchall()
+    ]
+
+
+def score_candidates_in_python(cursor, user_id: int, mbti, heart_rate: int, temperature: float):
+    """모든 후보를 가져와 Python에서 궁합 점수 계산 (점수 순 정렬)"""
+    candidates_query = """
+        SELECT user_id, username, mbti, profile_image_url, heart_rate, temperature
+        FROM users
+        WHERE user_id != %s
+    """
+    cursor.execute(candidates_query, (user_id,))
+    all_candidates = cursor.fetchall()
+    
+    candidates_with_scores = []
+    
+    for candidate in all_candidates:
+        candidate_heart_rate = candidate[4] or 70
+        candidate_temperature = float(candidate[5]) if candidate[5] is not None else 36.5
+        
+        compatibility = calculate_total_compatibility(
+            mbti, candidate[2],
+            heart_rate, candidate_heart_rate,
+            temperature, candidate_temperature
+        )
+        
+        candidates_with_scores.append({
+            "user_id": candidate[0],
+            "username": candidate[1],
+            "mbti": candidate[2],
+            "profile_image_url": candidate[3],
+            "compatibility_score": compatibility["total_score"],
+            "mbti_score": compatibility["mbti_score"],
+            "heart_rate_score": compatibility["heart_rate_score"],
+            "temperature_score": compatibility["temperature_score"]
+        })
+    
+    # 점수 순 정렬
+    candidates_with_scores.sort(key=lambda x: x["compatibility_score"], reverse=True)
+    return candidates_with_scores
+
+
+@router.get("/db-scoring/verify/{user_id}")
+def verify_db_scoring(user_id: int, connection = Depends(get_db)):
+    """DB 점수 계산 결과가 Python 계산과 같은지 사용자 한 명 기준으로 전체 후보 비교"""
+    try:
+        current_user = UserLoader(connection).load(user_id)
+        
+        if not current_user:
+            raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다")
+        
+        cursor = connection.cursor()
+        mbti = current_user["mbti"]
+        heart_rate = current_user["heart_rate"] or 70
+        temperature = float(current_user["temperature"]) if current_user["temperature"] is not None else 36.5
+        
+        python_scores = score_candidates_in_python(cursor, user_id, mbti, heart_rate, temperature)
+        db_scores = score_candidates_in_db(cursor, user_id, mbti, heart_rate, temperature)
+        cursor.close()
+        
+        fields = ["compatibility_score", "mbti_score", "heart_rate_score", "temperature_score"]
+        db_by_id = {c["user_id"]: c for c in db_scores}
+        mismatches = []
+        for expected in python_scores:
+            actual = db_by_id.get(expected["user_id"])
+            if actual is None or any(actual[f] != expected[f] for f in fields):
+                mismatches.append({
+                    "user_id": expected["user_id"],
+                    "python": {f: expected[f] for f in fields},
+                    "db": {f: actual[f] for f in fields} if actual else None
+                })
+        
+        python_order = [c["user_id"] for c in python_scores]
+        db_order = [c["user_id"] for c in db_scores]
+        
+        return {
+            "user_id": user_id,
+            "candidate_count": len(python_scores),
+            "identical": not mismatches and python_order == db_order,
+            "same_order": python_order == db_order,
+            "mismatches": mismatches
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+
+
 @router.get("/{user_id}")
-def get_fated_matches(user_id: int, limit: int = 2, connection = Depends(get_db)):
+def get_fated_matches(
+    user_id: int,
+    limit: int = 2,
+    db_scoring: Optional[bool] = None,
+    connection = Depends(get_db)
+):
     """
     특정 사용자의 운명의 상대 조회 (결과 확인 버튼 로직)
     
     Args:
         user_id: 사용자 ID
         limit: 반환할 인원 (기본 2명)
+        db_scoring: MySQL에서 점수 계산 후 상위 limit명만 전송 (기본값: config.FATED_MATCH_DB_SCORING)
     """
     try:
-        cursor = connection.cursor()
-        
         # 현재 사용자 정보
-        user_query = """
-            SELECT user_id, username, mbti, profile_image_url, heart_rate, temperature
-            FROM users
-            WHERE user_id = %s
-        """
-        cursor.execute(user_query, (user_id,))
-        current_user = cursor.fetchone()
+        current_user = UserLoader(connection).load(user_id)
         
         if not current_user:
-            cursor.close()
             raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다")
         
-        current_username = current_user[1]
-        current_mbti = current_user[2]
-        current_image = current_user[3]
-        current_heart_rate = current_user[4] or 70
-        current_temperature = float(current_user[5]) if current_user[5] is not None else 36.5
-        
-        # 다른 모든 사용자
-        candidates_query = """
-            SELECT user_id, username, mbti, profile_image_url, heart_rate, temperature
-            FROM users
-            WHERE user_id != %s
-        """
-        cursor.execute(candidates_query, (user_id,))
-        all_candidates = cursor.fetchall()
-        
-        if len(all_candidates) < 1:
+        cursor = connection.cursor()
+        current_username = current_user["username"]
+        current_mbti = current_user["mbti"]
+        current_image = current_user["profile_image_url"]
+        current_heart_rate = current_user["heart_rate"] or 70
+        current_temperature = float(current_user["temperature"]) if current_user["temperature"] is not None else 36.5
+        
+        if db_scoring is None:
+            from config import FATED_MATCH_DB_SCORING
+            db_scoring = FATED_MATCH_DB_SCORING
+        
+        if db_scoring:
+            # 점수표 테이블이 없으면 Python 계산으로 대체
+            schema.ensure_loaded(cursor)
+            db_scoring = schema.has_table("mbti_compatibility")
+        
+        if db_scoring:
+            top_matches = score_candidates_in_db(
+                cursor, user_id,
+                current_mbti, current_heart_rate, current_temperature,
+                limit
+            )
+        else:
+            # 상위 N명 선택
+            top_matches = score_candidates_in_python(
+                cursor, user_id,
+                current_mbti, current_heart_rate, current_temperature
+            )[:limit]
+        
+        if len(top_matches) < 1 and limit > 0:
             cursor.close()
             raise HTTPException(status_code=400, detail="다른 사용자가 없습니다")
         
-        # 궁합 계산
-        candidates_with_scores = []
-        
-        for candidate in all_candidates:
-            candidate_id = candidate[0]
-            candidate_name = candidate[1]
-            candidate_mbti = candidate[2]
-            candidate_image = candidate[3]
-            candidate_heart_rate = candidate[4] or 70
-            candidate_temperature = float(candidate[5]) if candidate[5] is not None else 36.5
-            
-            compatibility = calculate_total_compatibility(
-                current_mbti, candidate_mbti,
-                current_heart_rate, candidate_heart_rate,
-                current_temperature, candidate_temperature
-            )
-            
-            candidates_with_scores.append({
-                "user_id": candidate_id,
-                "username": candidate_name,
-                "mbti": candidate_mbti,
-                "profile_image_url": candidate_image,
-                "compatibility_score": compatibility["total_score"],
-                "mbti_score": compatibility["mbti_score"],
-                "heart_rate_score": compatibility["heart_rate_score"],
-                "temperature_score": compatibility["temperature_score"]
-            })
-        
-        # 점수 순 정렬
-        candidates_with_scores.sort(key=lambda x: x["compatibility_score"], reverse=True)
-        
-        # 상위 N명 선택
-        top_matches = candidates_with_scores[:limit]
-        
         # DB에 저장
         cursor.execute("DELETE FROM fated_matches WHERE user_id = %s", (user_id,))
         
@@ -208,14 +382,8 @@ def calculate_top_user_ids(
         print(f"대상: {target_user_ids}")
         print(f"{'='*60}")
         
-        # ✅ 핵심 수정: 매칭 대상도 같은 그룹으로 제한
-        placeholders = ','.join(['%s'] * len(target_user_ids))
-        cursor.execute(f"""
-            SELECT user_id, mbti, heart_rate, temperature
-            FROM users
-            WHERE user_id IN ({placeholders})
-        """, target_user_ids)
-        all_users = cursor.fetchall()
+        # ✅ 핵심 수정: 매칭 대상도 같은 그룹으로 제한 (이미 조회한 행 재사용)
+        all_users = [(u[0], u[2], u[3], u[4]) for u in target_users]
         
         # 선택된 사용자들끼리만 매칭 계산
         updated_count = 0
@@ -293,13 +461,21 @@ def calculate_top_user_ids(
         connection.rollback()
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
 
+def progress_at(elapsed: float, duration: float) -> int:
+    """심박수 측정 구간 진행률 (40% ~ 90%)"""
+    return 40 + int((elapsed / duration) * 50)
+
+
 @router.websocket("/ws/measure/{user_id}")
-async def websocket_measure_sensor(websocket: WebSocket, user_id: int):
+async def websocket_measure_sensor(websocket: WebSocket, user_id: int, force: bool = False):
     """웹소켓 센서 측정"""
     print(f"[WebSocket] 연결 시도: user_id={user_id}")
     """
     웹소켓으로 실시간 센서 측정
     
+    최근 측정값이 유효 시간 안에 있으면 센서를 읽지 않고 바로 complete를 전송
+    (force=true 쿼리 파라미터로 강제 재측정)
+    
     실시간 전송 데이터:
     - status: 현재 상태 (준비중, 측정중, 완료, 오류)
     - progress: 진행률 (0-100)
@@ -316,8 +492,7 @@ async def websocket_measure_sensor(websocket: WebSocket, user_id: int):
         cursor = connection.cursor()
         
         # 사용자 확인
-        cursor.execute("SELECT username FROM users WHERE user_id = %s", (user_id,))
-        user = cursor.fetchone()
+        user = get_user_with_measurement(cursor, user_id)
         
         if not user:
             await websocket.send_json({
@@ -327,7 +502,25 @@ async def websocket_measure_sensor(websocket: WebSocket, user_id: int):
             await websocket.close()
             return
         
-        username = user[0]
+        username, stored_heart_rate, stored_temperature, is_fresh = user
+        
+        # 최근 측정값 재사용
+        if is_fresh and not force:
+            await websocket.send_json({
+                "status": "complete",
+                "message": f"{username}님의 최근 측정값을 사용합니다",
+                "progress": 100,
+                "reused": True,
+                "result": {
+                    "user_id": user_id,
+                    "username": username,
+                    "heart_rate": stored_heart_rate,
+                    "temperature": round(stored_temperature, 1)
+                }
+            })
+            cursor.close()
+            connection.close()
+            return
         
         # 시작 메시지
         await websocket.send_json({
@@ -393,6 +586,8 @@ async def websocket_measure_sensor(websocket: WebSocket, user_id: int):
         # 심박수 측정 (실시간 진행률 전송)
         duration = 15
         samples = []
+        monitor = SignalQualityMonitor()
+        quality_checked = False
         start_time = asyncio.get_event_loop().time()
         
         while True:
@@ -406,8 +601,35 @@ async def websocket_measure_sensor(websocket: WebSocket, user_id: int):
             value = await loop.run_in_executor(None, sensor_manager.heart_sensor.read_adc)
             samples.append(value)
             
+            # 초반 신호 품질 확인 (불량이면 바로 중단, 저장하지 않음)
+            if not quality_checked:
+                monitor.update(value)
+                if elapsed >= QUALITY_WINDOW:
+                    quality_checked = True
+                    try:
+                        warning = monitor.evaluate()
+                    except SignalQualityError as quality_error:
+                        sensor_manager.close()
+                        await websocket.send_json({
+                            "status": "error",
+                            "message": quality_error.message,
+                            "progress": progress_at(elapsed, duration),
+                            **quality_error.to_dict()
+                        })
+                        cursor.close()
+                        connection.close()
+                        return
+                    if warning:
+                        await websocket.send_json({
+                            "status": "measuring_heartrate",
+                            "message": "신호 변화가 너무 큽니다. 움직이지 마세요",
+                            "progress": progress_at(elapsed, duration),
+                            "warning": warning,
+                            "signal": monitor.stats()
+                        })
+            
             # 진행률 계산 (40% ~ 90%)
-            progress = 40 + int((elapsed / duration) * 50)
+            progress = progress_at(elapsed, duration)
             
             # 실시간 전송 (0.5초마다)
             if len(samples) % 50 == 0:
@@ -419,7 +641,7 @@ async def websocket_measure_sensor(websocket: WebSocket, user_id: int):
                     "elapsed": round(elapsed, 1)
                 })
             
-            await asyncio.sleep(0.01)
+            await asyncio.sleep(sensor_manager.heart_sensor.sleep_interval)
         
         # 심박수 계산
         await websocket.send_json({
@@ -437,8 +659,11 @@ async def websocket_measure_sensor(websocket: WebSocket, user_id: int):
         last_beat_time = 0
         beat_intervals = []
         
+        # 웹소켓 경로는 executor 오버헤드가 있어 실제 측정 간격 사용
+        sample_period = duration / len(samples) if samples else 0.01
+        
         for i, value in enumerate(samples):
-            current_time = i * 0.01
+            current_time = i * sample_period
             if i > 0 and samples[i-1] < threshold and value >= threshold:
                 if current_time - last_beat_time > 0.3:
                     beats += 1
@@ -468,12 +693,14 @@ async def websocket_measure_sensor(websocket: WebSocket, user_id: int):
         """
         cursor.execute(update_query, (heart_rate, temperature, user_id))
         connection.commit()
+        user_cache.invalidate(user_id)
         
         # 완료
         await websocket.send_json({
             "status": "complete",
             "message": f"{username}님 측정 완료!",
             "progress": 100,
+            "reused": False,
             "result": {
                 "user_id": user_id,
                 "username": username,
@@ -498,24 +725,53 @@ async def websocket_measure_sensor(websocket: WebSocket, user_id: int):
 
 
 @router.post("/measure-sensor/{user_id}")
-def measure_and_update_sensor(user_id: int, auto_calculate: bool = True, connection = Depends(get_db)):
-    """실제 센서로 측정 후 DB 업데이트 및 자동 매칭 계산"""
+def measure_and_update_sensor(
+    user_id: int,
+    auto_calculate: bool = True,
+    force: bool = False,
+    connection = Depends(get_db)
+):
+    """
+    실제 센서로 측정 후 DB 업데이트 및 자동 매칭 계산
+    
+    Args:
+        user_id: 사용자 ID
+        auto_calculate: 측정 후 매칭 재계산 여부
+        force: 최근 측정값이 있어도 강제로 다시 측정
+    """
     try:
         cursor = connection.cursor()
-        cursor.execute("SELECT username FROM users WHERE user_id = %s", (user_id,))
-        user = cursor.fetchone()
+        user = get_user_with_measurement(cursor, user_id)
         
         if not user:
             cursor.close()
             raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다")
-        username = user[0]
+        username, stored_heart_rate, stored_temperature, is_fresh = user
+        
+        # 최근 측정값 재사용 (센서 측정 생략)
+        if is_fresh and not force:
+            cursor.close()
+            return {
+                "success": True,
+                "message": f"{username}님의 최근 측정값을 사용합니다",
+                "user_id": user_id,
+                "username": username,
+                "reused": True,
+                "measured_data": {
+                    "heart_rate": stored_heart_rate,
+                    "temperature": stored_temperature
+                }
+            }
+        
         print(f"\n{'='*60}")
         print(f"{username} (ID: {user_id})님의 센서 측정 시작")
         print(f"{'='*60}")
         
         sensor_manager = SensorManager(temp_address=0x3A, heart_channel=0)
-        sensor_data = sensor_manager.read_sensors()
-        sensor_manager.close()
+        try:
+            sensor_data = sensor_manager.read_sensors()
+        finally:
+            sensor_manager.close()
         
         print(f"측정 완료: 심박수 {sensor_data['heart_rate']} BPM, 체온 {sensor_data['temperature']}°C")
     
@@ -530,6 +786,7 @@ def measure_and_update_sensor(user_id: int, auto_calculate: bool = True, connect
             user_id
         ))
         connection.commit()
+        user_cache.invalidate(user_id)
         
         # 자동 매칭 계산
         match_result = None
@@ -545,12 +802,18 @@ def measure_and_update_sensor(user_id: int, auto_calculate: bool = True, connect
             "message": f"{username}님의 센서 데이터가 측정되고 저장되었습니다",
             "user_id": user_id,
             "username": username,
+            "reused": False,
             "measured_data": {
                 "heart_rate": sensor_data['heart_rate'],
                 "temperature": sensor_data['temperature']
             }
         }
         
+        if sensor_data.get('warning'):
+            # 측정은 끝났지만 신호가 흔들렸음 (websocket 측정의 경고와 같은 값)
+            response["warning"] = sensor_data['warning']
+            response["warning_message"] = "신호 변화가 너무 큽니다. 움직이지 마세요"
+        
         if match_result:
             response["matching_updated"] = True
             response["top_matches"] = match_result
@@ -559,6 +822,9 @@ def measure_and_update_sensor(user_id: int, auto_calculate: bool = True, connect
         
     except HTTPException:
         raise
+    except SignalQualityError as e:
+        print(f"신호 품질 불량으로 측정 중단: {e.reason} {e.stats}")
+        raise HTTPException(status_code=422, detail=e.to_dict())
     except Exception as e:
         connection.rollback()
         print(f"오류 발생: {e}")
@@ -0,0 +1,63 @@
+import hashlib
+import json
+from fastapi import Request, Response
+
+# 정적 응답용 기본 캐시 정책 (하루)
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+
+
+def serialize_json(payload) -> bytes:
+    """JSONResponse와 같은 형식으로 직렬화"""
+    return json.dumps(
+        payload,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def make_etag(body: bytes) -> str:
+    """본문 해시 기반 strong ETag"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 헤더가 etag와 일치하는지 (weak 비교)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cached_json_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    cache_control: str = STATIC_CACHE_CONTROL
+) -> Response:
+    """미리 직렬화된 본문을 ETag/Cache-Control과 함께 반환 (일치하면 304)"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class CachedJson:
+    """미리 직렬화한 JSON 본문과 ETag"""
+    __slots__ = ("body", "etag")
+
+    def __init__(self, payload):
+        self.body = serialize_json(payload)
+        self.etag = make_etag(self.body)
+
+    def response(self, request: Request, cache_control: str = STATIC_CACHE_CONTROL) -> Response:
+        return cached_json_response(request, self.body, self.etag, cache_control)
@@ -0,0 +1,328 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal
+from .http_cache import CachedJson
+from .schema import schema, rating_aggregate_sql
+
+
+class SortedKeyList:
+    """
+    순위 조회용 정렬 리스트
+
+    정렬된 블록 리스트 + 블록 크기 Fenwick 트리로
+    삽입/삭제/순위(index)/k번째(at) 조회가 모두 O(log n) (블록 크기는 상수)
+    """
+    LOAD = 256
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._lists = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [block[-1] for block in self._lists]
+        self._len = len(keys)
+        self._build_tree()
+
+    def __len__(self):
+        return self._len
+
+    def _build_tree(self):
+        self._tree = [0] * (len(self._lists) + 1)
+        for i, block in enumerate(self._lists):
+            self._tree_add(i, len(block))
+
+    def _tree_add(self, i, delta):
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _tree_prefix(self, i):
+        """블록 0 ~ i-1의 원소 개수"""
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _tree_find(self, k):
+        """k번째(0부터) 원소가 들어 있는 블록과 블록 내 위치"""
+        pos = 0
+        step = 1 << (len(self._tree).bit_length())
+        while step:
+            nxt = pos + step
+            if nxt < len(self._tree) and self._tree[nxt] <= k:
+                pos = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return pos, k
+
+    def add(self, key):
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            self._build_tree()
+            return
+
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            i -= 1
+        block = self._lists[i]
+        insort(block, key)
+        self._maxes[i] = block[-1]
+        self._len += 1
+
+        if len(block) > self.LOAD * 2:
+            half = len(block) // 2
+            self._lists[i:i + 1] = [block[:half], block[half:]]
+            self._maxes[i:i + 1] = [block[half - 1], block[-1]]
+            self._build_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            raise ValueError(f"{key} not in list")
+        block = self._lists[i]
+        j = bisect_left(block, key)
+        if j == len(block) or block[j] != key:
+            raise ValueError(f"{key} not in list")
+        del block[j]
+        self._len -= 1
+
+        if block:
+            self._maxes[i] = block[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._lists[i]
+            del self._maxes[i]
+            self._build_tree()
+
+    def index(self, key):
+        """key보다 작은 원소 개수 (key가 있으면 그 위치)"""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            return self._len
+        return self._tree_prefix(i) + bisect_left(self._lists[i], key)
+
+    def at(self, k):
+        if not 0 <= k < self._len:
+            raise IndexError("index out of range")
+        i, j = self._tree_find(k)
+        return self._lists[i][j]
+
+    def islice(self, start, stop):
+        """start ~ stop-1 위치의 원소"""
+        start = max(0, start)
+        stop = min(self._len, stop)
+        if start >= stop:
+            return []
+        i, j = self._tree_find(start)
+        result = []
+        while len(result) < stop - start:
+            block = self._lists[i]
+            take = min(len(block) - j, stop - start - len(result))
+            result.extend(block[j:j + take])
+            i += 1
+            j = 0
+        return result
+
+    def __contains__(self, key):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            return False
+        block = self._lists[i]
+        j = bisect_right(block, key) - 1
+        return j >= 0 and block[j] == key
+
+
+def _to_decimal(value):
+    if value is None:
+        return Decimal(0)
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def ranking_key(couple_id, average_rating, rating_count, score):
+    """
+    랭킹 정렬 키 (오름차순 = 1등부터)
+
+    get_couple_ranking의 ORDER BY average_rating DESC, rating_count DESC, score DESC, couple_id와 같은 순서
+    """
+    return (
+        -_to_decimal(average_rating),
+        -int(rating_count or 0),
+        -_to_decimal(score),
+        couple_id
+    )
+
+
+class RankingPageCache:
+    """
+    직렬화된 랭킹 페이지 캐시 ((limit, offset) 키)
+
+    랭킹이 바뀌면 invalidate()로 버전을 올려 전체를 버림
+    (페이지를 만드는 동안 버전이 바뀌었으면 저장하지 않음)
+    """
+    MAX_PAGES = 64
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = {}
+        self.version = 0
+
+    def get(self, limit, offset):
+        return self._pages.get((limit, offset))
+
+    def put(self, limit, offset, payload, version):
+        entry = CachedJson(payload)
+        with self._lock:
+            if version != self.version:
+                return entry
+            if len(self._pages) >= self.MAX_PAGES:
+                self._pages.pop(next(iter(self._pages)))
+            self._pages[(limit, offset)] = entry
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._pages = {}
+
+
+ranking_page_cache = RankingPageCache()
+
+
+class Leaderboard:
+    """
+    프로세스 내 커플 랭킹
+
+    시작 시 couple_ranking 전체를 읽고, 커플 생성/별점/삭제 시 갱신
+    순위가 바뀌면 ranking_page_cache도 함께 무효화
+    (워커 프로세스마다 따로 유지되므로 다른 프로세스의 변경은 invalidate 후 다시 로드해야 반영됨)
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = SortedKeyList()
+        self._key_by_id = {}
+        self.loaded = False
+        # 순위가 바뀔 때마다 증가 (스냅샷이 변경 여부 판단에 사용)
+        self.version = 0
+        # 순위가 바뀐 뒤 호출할 함수 (실시간 랭킹 전송 등)
+        self.listeners = []
+
+    def load(self, cursor):
+        schema.ensure_loaded(cursor)
+        cursor.execute(f"""
+            SELECT cr.couple_id, {rating_aggregate_sql("cr")}, cr.score
+            FROM couple_ranking cr
+        """)
+        rows = cursor.fetchall()
+        key_by_id = {row[0]: ranking_key(*row) for row in rows}
+        with self._lock:
+            self._key_by_id = key_by_id
+            self._keys = SortedKeyList(key_by_id.values())
+            self.loaded = True
+            self.version += 1
+        self._changed()
+
+    def load_from_db(self):
+        from config import engine
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            self.load(cursor)
+            cursor.close()
+        finally:
+            connection.close()
+
+    def ensure_loaded(self, cursor):
+        if not self.loaded:
+            self.load(cursor)
+
+    def invalidate(self):
+        """다음 조회 시 DB에서 다시 로드"""
+        with self._lock:
+            self.loaded = False
+        ranking_page_cache.invalidate()
+
+    def _changed(self):
+        ranking_page_cache.invalidate()
+        for listener in self.listeners:
+            listener()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def upsert(self, couple_id, average_rating, rating_count, score):
+        if not self.loaded:
+            return
+        key = ranking_key(couple_id, average_rating, rating_count, score)
+        with self._lock:
+            old_key = self._key_by_id.get(couple_id)
+            if old_key == key:
+                return
+            if old_key is not None:
+                self._keys.remove(old_key)
+            self._keys.add(key)
+            self._key_by_id[couple_id] = key
+            self.version += 1
+        self._changed()
+
+    def remove(self, couple_id):
+        if not self.loaded:
+            return
+        with self._lock:
+            old_key = self._key_by_id.pop(couple_id, None)
+            if old_key is None:
+                return
+            self._keys.remove(old_key)
+            self.version += 1
+        self._changed()
+
+    def rank(self, couple_id):
+        """1부터 시작하는 순위 (없으면 None)"""
+        with self._lock:
+            key = self._key_by_id.get(couple_id)
+            if key is None:
+                return None
+            return self._keys.index(key) + 1
+
+    def page(self, limit, offset):
+        """[(rank, couple_id), ...]"""
+        offset = max(0, offset)
+        limit = max(0, limit)
+        with self._lock:
+            keys = self._keys.islice(offset, offset + limit)
+        return [(offset + i + 1, key[3]) for i, key in enumerate(keys)]
+
+    def entries(self, limit, offset=0):
+        """[(rank, couple_id, average_rating, rating_count, score), ...]"""
+        offset = max(0, offset)
+        limit = max(0, limit)
+        with self._lock:
+            keys = self._keys.islice(offset, offset + limit)
+        return [(offset + i + 1, key[3], -key[0], -key[1], -key[2]) for i, key in enumerate(keys)]
+
+    def around(self, couple_id, above=2, below=2):
+        """couple_id 바로 위 above팀, 자신, 바로 아래 below팀의 [(rank, couple_id), ...]"""
+        with self._lock:
+            key = self._key_by_id.get(couple_id)
+            if key is None:
+                return None
+            position = self._keys.index(key)
+            start = max(0, position - above)
+            keys = self._keys.islice(start, position + below + 1)
+        return [(start + i + 1, k[3]) for i, k in enumerate(keys)]
+
+    def snapshot(self):
+        """(version, [(couple_id, score), ...]) 1등부터 순서대로"""
+        with self._lock:
+            keys = self._keys.islice(0, len(self._keys))
+            version = self.version
+        return version, [(key[3], -key[2]) for key in keys]
+
+
+leaderboard = Leaderboard()
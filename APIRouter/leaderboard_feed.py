@@ -0,0 +1,92 @@
+import threading
+from .leaderboard import leaderboard
+from .pubsub import hub
+
+
+def format_entry(entry) -> dict:
+    rank, couple_id, average_rating, rating_count, score = entry
+    return {
+        "couple_id": couple_id,
+        "rank": rank,
+        "average_rating": round(float(average_rating), 2),
+        "rating_count": rating_count,
+        "score": float(score)
+    }
+
+
+class LeaderboardFeed:
+    """
+    상위 TOP_N팀 랭킹의 실시간 변경 전송
+
+    랭킹이 바뀌면 BATCH_WINDOW초 동안 모았다가, 마지막으로 보낸 상태와 비교해
+    순위/점수가 바뀐 팀(changed)과 TOP_N 밖으로 나간 팀(removed)만 한 번에 전송
+    """
+    TOPIC = "leaderboard"
+    TOP_N = 50
+    BATCH_WINDOW = 0.5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._state = {}
+        self.version = 0
+
+    def _current(self):
+        return {entry[1]: entry for entry in leaderboard.entries(self.TOP_N)}
+
+    def snapshot_message(self):
+        return {
+            "type": "snapshot",
+            "version": self.version,
+            "count": len(leaderboard),
+            "ranking": [format_entry(entry) for entry in sorted(self._state.values())]
+        }
+
+    def subscribe(self):
+        """(queue, 첫 메시지) - 이벤트 루프에서 호출"""
+        if not hub.has_subscribers(self.TOPIC):
+            # 구독자가 없는 동안에는 상태를 따라가지 않았으므로 새로 계산
+            self._state = self._current()
+        queue = hub.subscribe(self.TOPIC)
+        return queue, self.snapshot_message()
+
+    def unsubscribe(self, queue):
+        hub.unsubscribe(self.TOPIC, queue)
+
+    def notify(self):
+        """랭킹 변경 알림 (leaderboard 리스너, 어느 스레드에서든 호출 가능)"""
+        if not hub.has_subscribers(self.TOPIC):
+            return
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        hub.call_later(self.BATCH_WINDOW, self._flush)
+
+    def _flush(self):
+        with self._lock:
+            self._scheduled = False
+
+        current = self._current()
+        changed = [
+            format_entry(entry)
+            for couple_id, entry in sorted(current.items(), key=lambda item: item[1])
+            if self._state.get(couple_id) != entry
+        ]
+        removed = [couple_id for couple_id in self._state if couple_id not in current]
+        self._state = current
+
+        if not changed and not removed:
+            return
+        self.version += 1
+        hub.publish(self.TOPIC, {
+            "type": "diff",
+            "version": self.version,
+            "count": len(leaderboard),
+            "changed": changed,
+            "removed": removed
+        })
+
+
+leaderboard_feed = LeaderboardFeed()
+leaderboard.listeners.append(leaderboard_feed.notify)
@@ -0,0 +1,125 @@
+from typing import Optional
+from sqlalchemy.types import TypeDecorator, SmallInteger
+
+# 화면 표시 순서 (궁합표 순서)
+MBTI_TYPES = [
+    "ISTJ", "ISFJ", "INFJ", "INTJ",
+    "ISTP", "ISFP", "INFP", "INTP",
+    "ESTP", "ESFP", "ENFP", "ENTP",
+    "ESTJ", "ESFJ", "ENFJ", "ENTJ"
+]
+
+# 4bit 인코딩: E=8, N=4, T=2, J=1 (반대쪽 글자는 0)
+_LETTER_BITS = (("E", 8), ("N", 4), ("T", 2), ("J", 1))
+
+
+def _encode(mbti: str) -> int:
+    return sum(bit for (letter, bit), char in zip(_LETTER_BITS, mbti) if char == letter)
+
+
+MBTI_CODES = {mbti: _encode(mbti) for mbti in MBTI_TYPES}
+MBTI_NAMES = [None] * 16
+for _mbti, _code in MBTI_CODES.items():
+    MBTI_NAMES[_code] = _mbti
+
+# 궁합표에 없는 조합의 기본 점수
+SAME_TYPE_SCORE = 75
+DEFAULT_SCORE = 60
+
+_COMPATIBILITY_MAP = {
+    "INFJ": {"ENFP": 100, "ENTP": 89, "INFP": 86, "INTJ": 75, "INTP": 86, "ENFJ": 89, "ENTJ": 89, "ISFJ": 50, "ISFP": 61, "ISTJ": 50, "ISTP": 61, "ESFJ": 64, "ESFP": 75, "ESTJ": 64, "ESTP": 75},
+    "INFP": {"ENFJ": 100, "ENTJ": 89, "INFJ": 86, "INTJ": 86, "INTP": 75, "ENFP": 89, "ENTP": 89, "ISFJ": 61, "ISFP": 50, "ISTJ": 61, "ISTP": 50, "ESFJ": 75, "ESFP": 64, "ESTJ": 75, "ESTP": 64},
+    "ENFJ": {"INFP": 100, "INTP": 100, "INFJ": 89, "INTJ": 89, "ENFP": 100, "ENTP": 100, "ISFJ": 64, "ISFP": 75, "ISTJ": 64, "ISTP": 75, "ESFJ": 100, "ESFP": 89, "ESTJ": 100, "ESTP": 89},
+    "ENFP": {"INFJ": 100, "INTJ": 100, "INFP": 89, "INTP": 89, "ENFJ": 100, "ENTJ": 100, "ISFJ": 75, "ISFP": 64, "ISTJ": 75, "ISTP": 64, "ESFJ": 89, "ESFP": 100, "ESTJ": 89, "ESTP": 100},
+    "INTJ": {"ENFP": 100, "ENTP": 100, "INFJ": 75, "INFP": 86, "INTP": 86, "ENFJ": 89, "ENTJ": 89, "ISFJ": 50, "ISFP": 61, "ISTJ": 50, "ISTP": 61, "ESFJ": 64, "ESFP": 75, "ESTJ": 64, "ESTP": 75},
+    "INTP": {"ENFJ": 100, "ENTJ": 100, "INFJ": 86, "INFP": 75, "INTJ": 86, "ENFP": 89, "ENTP": 89, "ISFJ": 61, "ISFP": 50, "ISTJ": 61, "ISTP": 50, "ESFJ": 75, "ESFP": 64, "ESTJ": 75, "ESTP": 64},
+    "ENTJ": {"INFP": 100, "INTP": 100, "INFJ": 89, "INTJ": 89, "ENFJ": 100, "ENTP": 100, "ISFJ": 64, "ISFP": 75, "ISTJ": 64, "ISTP": 75, "ESFJ": 100, "ESFP": 89, "ESTJ": 100, "ESTP": 89},
+    "ENTP": {"INFJ": 100, "INTJ": 100, "INFP": 89, "INTP": 89, "ENFJ": 100, "ENTJ": 100, "ISFJ": 75, "ISFP": 64, "ISTJ": 75, "ISTP": 64, "ESFJ": 89, "ESFP": 100, "ESTJ": 89, "ESTP": 100},
+    "ISFJ": {"ESFP": 100, "ESTP": 89, "ISFP": 86, "ISTJ": 75, "ISTP": 86, "ESFJ": 89, "ESTJ": 89, "INFJ": 50, "INFP": 61, "INTJ": 50, "INTP": 61, "ENFJ": 64, "ENFP": 75, "ENTJ": 64, "ENTP": 75},
+    "ISFP": {"ESFJ": 100, "ESTJ": 89, "ISFJ": 86, "ISTJ": 86, "ISTP": 75, "ESFP": 89, "ESTP": 89, "INFJ": 61, "INFP": 50, "INTJ": 61, "INTP": 50, "ENFJ": 75, "ENFP": 64, "ENTJ": 75, "ENTP": 64},
+    "ESFJ": {"ISFP": 100, "ISTP": 100, "ISFJ": 89, "ISTJ": 89, "ESFP": 100, "ESTP": 100, "INFJ": 64, "INFP": 75, "INTJ": 64, "INTP": 75, "ENFJ": 100, "ENFP": 89, "ENTJ": 100, "ENTP": 89},
+    "ESFP": {"ISFJ": 100, "ISTJ": 100, "ISFP": 89, "ISTP": 89, "ESFJ": 100, "ESTJ": 100, "INFJ": 75, "INFP": 64, "INTJ": 75, "INTP": 64, "ENFJ": 89, "ENFP": 100, "ENTJ": 89, "ENTP": 100},
+    "ISTJ": {"ESFP": 100, "ESTP": 89, "ISFJ": 75, "ISFP": 86, "ISTP": 86, "ESFJ": 89, "ESTJ": 89, "INFJ": 50, "INFP": 61, "INTJ": 50, "INTP": 61, "ENFJ": 64, "ENFP": 75, "ENTJ": 64, "ENTP": 75},
+    "ISTP": {"ESFJ": 100, "ESTJ": 100, "ISFJ": 86, "ISFP": 75, "ISTJ": 86, "ESFP": 89, "ESTP": 89, "INFJ": 61, "INFP": 50, "INTJ": 61, "INTP": 50, "ENFJ": 75, "ENFP": 64, "ENTJ": 75, "ENTP": 64},
+    "ESTJ": {"ISFP": 100, "ISTP": 100, "ISFJ": 89, "ISTJ": 89, "ESFJ": 100, "ESTP": 100, "INFJ": 64, "INFP": 75, "INTJ": 64, "INTP": 75, "ENFJ": 100, "ENFP": 89, "ENTJ": 100, "ENTP": 89},
+    "ESTP": {"ISFJ": 100, "ISTJ": 100, "ISFP": 89, "ISTP": 89, "ESFJ": 100, "ESTJ": 100, "INFJ": 75, "INFP": 64, "INTJ": 75, "INTP": 64, "ENFJ": 89, "ENFP": 100, "ENTJ": 89, "ENTP": 100},
+}
+
+
+def _build_score_matrix() -> list:
+    scores = [DEFAULT_SCORE] * 256
+    for mbti1, code1 in MBTI_CODES.items():
+        for mbti2, code2 in MBTI_CODES.items():
+            if mbti2 in _COMPATIBILITY_MAP[mbti1]:
+                score = _COMPATIBILITY_MAP[mbti1][mbti2]
+            elif mbti1 == mbti2:
+                score = SAME_TYPE_SCORE
+            else:
+                score = DEFAULT_SCORE
+            scores[(code1 << 4) | code2] = score
+    return scores
+
+
+# 16x16 궁합 점수 (인덱스: code1 << 4 | code2)
+MBTI_SCORES = _build_score_matrix()
+
+
+def encode_mbti(mbti: Optional[str]) -> Optional[int]:
+    """MBTI 문자열 → 0~15 코드 (올바르지 않으면 None)"""
+    if not mbti:
+        return None
+    return MBTI_CODES.get(mbti.upper())
+
+
+def decode_mbti(code: Optional[int]) -> Optional[str]:
+    """0~15 코드 → MBTI 문자열"""
+    if code is None or not 0 <= code < 16:
+        return None
+    return MBTI_NAMES[code]
+
+
+def is_valid_mbti(mbti: Optional[str]) -> bool:
+    return encode_mbti(mbti) is not None
+
+
+def mbti_score_by_code(code1: int, code2: int) -> int:
+    return MBTI_SCORES[(code1 << 4) | code2]
+
+
+def mbti_score(mbti1: Optional[str], mbti2: Optional[str]) -> int:
+    """
+    MBTI 궁합 점수
+
+    DB에 검증되지 않은 값이 있을 수 있으므로 코드가 없으면
+    같은 값이면 SAME_TYPE_SCORE, 아니면 DEFAULT_SCORE
+    """
+    code1 = MBTI_CODES.get(mbti1)
+    code2 = MBTI_CODES.get(mbti2)
+    if code1 is not None and code2 is not None:
+        return MBTI_SCORES[(code1 << 4) | code2]
+    if mbti1 == mbti2:
+        return SAME_TYPE_SCORE
+    return DEFAULT_SCORE
+
+
+class MbtiCode(TypeDecorator):
+    """MBTI를 TINYINT 컬럼(0~15)으로 저장하는 SQLAlchemy 타입"""
+    impl = SmallInteger
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "mysql":
+            from sqlalchemy.dialects.mysql import TINYINT
+            return dialect.type_descriptor(TINYINT(unsigned=True))
+        return dialect.type_descriptor(SmallInteger())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        code = encode_mbti(value)
+        if code is None:
+            raise ValueError(f"올바르지 않은 MBTI: {value}")
+        return code
+
+    def process_result_value(self, value, dialect):
+        return decode_mbti(value)
@@ -0,0 +1,40 @@
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """(created_at, id) 키셋 커서 → URL에 그대로 쓸 수 있는 문자열"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """encode_cursor 결과 → (created_at, id), 잘못된 값이면 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="올바르지 않은 커서입니다")
+
+
+def next_cursor(rows, limit, created_at_index, id_index):
+    """
+    limit + 1개를 조회한 결과에서 다음 페이지 커서 계산
+
+    Returns:
+        (이번 페이지 행, 다음 커서 또는 None)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[created_at_index], last[id_index])
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+
+class PubSubHub:
+    """
+    프로세스 내 pub/sub (websocket 구독자에게 이벤트 전달)
+
+    구독은 이벤트 루프에서, publish는 동기 라우터의 스레드풀에서도 호출 가능
+    (워커 프로세스마다 따로 동작하므로 같은 프로세스에서 일어난 변경만 전달됨)
+    """
+    QUEUE_SIZE = 64
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._loop = None
+
+    def subscribe(self, topic):
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, topic, queue):
+        with self._lock:
+            queues = self._subscribers.get(topic)
+            if queues:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[topic]
+
+    def has_subscribers(self, topic):
+        return topic in self._subscribers
+
+    def _in_loop(self):
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _call_soon(self, callback, *args):
+        loop = self._loop
+        if loop is None:
+            return
+        if self._in_loop():
+            callback(*args)
+            return
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # 서버 종료 중 (루프가 닫힘)
+            pass
+
+    def call_later(self, delay, callback):
+        """delay초 뒤 이벤트 루프에서 callback 실행 (어느 스레드에서든 호출 가능)"""
+        loop = self._loop
+        if loop is not None:
+            self._call_soon(loop.call_later, delay, callback)
+
+    def publish(self, topic, message):
+        """topic 구독자 모두에게 message 전달 (구독자가 없으면 아무것도 하지 않음)"""
+        if self.has_subscribers(topic):
+            self._call_soon(self._deliver, topic, message)
+
+    def _deliver(self, topic, message):
+        with self._lock:
+            queues = list(self._subscribers.get(topic, ()))
+        for queue in queues:
+            if queue.full():
+                # 따라오지 못하는 구독자는 밀린 메시지를 버리고 전체를 다시 받도록 알림
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+            else:
+                queue.put_nowait(message)
+
+
+async def forward_to_websocket(websocket, queue):
+    """
+    queue에 들어오는 메시지를 websocket으로 전송 (클라이언트가 연결을 끊으면 반환)
+
+    보내기만 하면 끊긴 연결을 다음 메시지를 보낼 때까지 알 수 없으므로 수신 루프를 함께 돌림
+    (클라이언트가 보낸 메시지는 무시)
+    """
+    async def send():
+        while True:
+            await websocket.send_json(await queue.get())
+
+    async def receive():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in done:
+        # 전송 중 오류(WebSocketDisconnect 등)는 호출한 쪽으로 전달
+        task.result()
+
+
+hub = PubSubHub()
@@ -0,0 +1,124 @@
+import threading
+
+# 있을 수도 없을 수도 있는 테이블/컬럼 (라우터가 기능을 켜고 끌 때 사용)
+OPTIONAL_TABLES = ["couple_ratings", "mbti_compatibility", "leaderboard_snapshots"]
+OPTIONAL_COLUMNS = {
+    "couple_ranking": ["rating_sum", "rating_count", "average_rating", "base_score"],
+}
+# 007_pair_unique_keys의 UNIQUE 인덱스 (없으면 라우터가 중복을 직접 확인)
+OPTIONAL_INDEXES = {
+    "couple_ranking": ["uq_couple_ranking_pair"],
+    "confessions": ["uq_confessions_pending"],
+}
+
+
+class SchemaCapabilities:
+    """
+    DB 스키마 기능 목록
+
+    시작 시 information_schema를 한 번만 조회해 저장하고 요청마다 다시 조회하지 않음
+    스키마를 바꾼 뒤에는 refresh (POST /api/schema/refresh)로 다시 읽어야 반영됨
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tables = set()
+        self.columns = set()
+        self.indexes = set()
+        self.loaded = False
+
+    def refresh(self, cursor):
+        table_names = OPTIONAL_TABLES + list(OPTIONAL_COLUMNS)
+        placeholders = ','.join(['%s'] * len(table_names))
+        cursor.execute(f"""
+            SELECT table_name, column_name
+            FROM information_schema.columns
+            WHERE table_schema = DATABASE()
+            AND table_name IN ({placeholders})
+        """, table_names)
+        rows = cursor.fetchall()
+
+        tables = {row[0] for row in rows}
+        columns = {(row[0], row[1]) for row in rows}
+
+        index_tables = list(OPTIONAL_INDEXES)
+        placeholders = ','.join(['%s'] * len(index_tables))
+        cursor.execute(f"""
+            SELECT DISTINCT table_name, index_name
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+            AND table_name IN ({placeholders})
+        """, index_tables)
+        indexes = {(row[0], row[1]) for row in cursor.fetchall()}
+
+        with self._lock:
+            self.tables = tables
+            self.columns = columns
+            self.indexes = indexes
+            self.loaded = True
+
+    def refresh_from_db(self):
+        from config import engine
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            self.refresh(cursor)
+            cursor.close()
+        finally:
+            connection.close()
+
+    def ensure_loaded(self, cursor):
+        if not self.loaded:
+            self.refresh(cursor)
+
+    def has_table(self, table):
+        return table in self.tables
+
+    def has_column(self, table, column):
+        return (table, column) in self.columns
+
+    def has_index(self, table, index):
+        return (table, index) in self.indexes
+
+    def missing_indexes(self):
+        return [
+            f"{table}.{index}"
+            for table, indexes in OPTIONAL_INDEXES.items()
+            for index in indexes
+            if not self.has_index(table, index)
+        ]
+
+    def as_dict(self):
+        return {
+            "tables": {table: table in self.tables for table in OPTIONAL_TABLES},
+            "columns": {
+                table: {column: (table, column) in self.columns for column in columns}
+                for table, columns in OPTIONAL_COLUMNS.items()
+            },
+            "indexes": {
+                table: {index: (table, index) in self.indexes for index in indexes}
+                for table, indexes in OPTIONAL_INDEXES.items()
+            }
+        }
+
+
+schema = SchemaCapabilities()
+
+
+# 마이그레이션 적용 여부에 따라 달라지는 SQL 조각 (schema가 로드된 뒤 호출)
+
+def rating_aggregate_sql(alias="cr"):
+    """
+    커플의 average_rating, rating_count 식 (별칭 포함)
+
+    002_couple_rating_aggregates 전이면 couple_ratings에서 직접 집계, 별점 테이블도 없으면 0
+    """
+    if schema.has_column("couple_ranking", "average_rating"):
+        return f"{alias}.average_rating AS average_rating, {alias}.rating_count AS rating_count"
+    if schema.has_table("couple_ratings"):
+        return (
+            f"(SELECT COALESCE(AVG(r.rating), 0) FROM couple_ratings r WHERE r.couple_id = {alias}.couple_id) AS average_rating, "
+            f"(SELECT COUNT(*) FROM couple_ratings r WHERE r.couple_id = {alias}.couple_id) AS rating_count"
+        )
+    return "0 AS average_rating, 0 AS rating_count"
+
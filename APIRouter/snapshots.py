@@ -0,0 +1,133 @@
+import asyncio
+import sys
+from array import array
+from datetime import datetime
+from decimal import Decimal
+from .leaderboard import leaderboard
+from .schema import schema
+
+
+def _pack(typecode, values) -> bytes:
+    packed = array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(typecode, data) -> array:
+    unpacked = array(typecode)
+    unpacked.frombytes(data)
+    if sys.byteorder == "big":
+        unpacked.byteswap()
+    return unpacked
+
+
+def pack_snapshot(entries):
+    """[(couple_id, score), ...] → (couple_ids 바이트, scores 바이트)"""
+    couple_ids = _pack("I", [couple_id for couple_id, _ in entries])
+    scores = _pack("i", [int(Decimal(score) * 100) for _, score in entries])
+    return couple_ids, scores
+
+
+class Snapshot:
+    """스냅샷 한 건 (순위 = 배열 위치 + 1)"""
+
+    def __init__(self, taken_at, couple_ids, scores):
+        self.taken_at = taken_at
+        self.couple_ids = _unpack("I", couple_ids)
+        self.scores = _unpack("i", scores)
+
+    def rank_of(self, couple_id):
+        """(순위, 점수), 스냅샷에 없으면 None"""
+        try:
+            position = self.couple_ids.index(couple_id)
+        except ValueError:
+            return None
+        return position + 1, self.scores[position] / 100
+
+    def top(self, limit):
+        """[(순위, couple_id, 점수), ...]"""
+        return [
+            (i + 1, self.couple_ids[i], self.scores[i] / 100)
+            for i in range(min(limit, len(self.couple_ids)))
+        ]
+
+
+class SnapshotRecorder:
+    """
+    메모리 랭킹을 주기적으로 leaderboard_snapshots에 저장
+
+    지난 스냅샷 이후 순위가 바뀌지 않았으면 저장하지 않음
+    (특정 시각의 순위는 그 시각 이전의 가장 최근 스냅샷으로 조회)
+    """
+
+    def __init__(self):
+        self.last_version = None
+
+    def take(self, cursor, connection):
+        """스냅샷을 저장했으면 True"""
+        schema.ensure_loaded(cursor)
+        if not schema.has_table("leaderboard_snapshots"):
+            return False
+
+        leaderboard.ensure_loaded(cursor)
+        version, entries = leaderboard.snapshot()
+        if version == self.last_version:
+            return False
+
+        couple_ids, scores = pack_snapshot(entries)
+        # 조회 API의 기본 시각(datetime.now())과 같은 시계를 쓰도록 DB NOW() 대신 앱 서버 시각 저장
+        cursor.execute("""
+            INSERT INTO leaderboard_snapshots (taken_at, couple_count, couple_ids, scores)
+            VALUES (%s, %s, %s, %s)
+        """, (datetime.now().replace(microsecond=0), len(entries), couple_ids, scores))
+        connection.commit()
+        self.last_version = version
+        return True
+
+    def take_from_db(self):
+        from config import engine
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            self.take(cursor, connection)
+            cursor.close()
+        finally:
+            connection.close()
+
+    async def run(self, interval):
+        """interval초마다 스냅샷 (lifespan에서 백그라운드 태스크로 실행)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.take_from_db)
+            except Exception as e:
+                print(f"⚠️ 랭킹 스냅샷 저장 실패: {e}")
+
+
+snapshot_recorder = SnapshotRecorder()
+
+
+def load_snapshot_at(cursor, at):
+    """at 시각 이전의 가장 최근 스냅샷 (없으면 None)"""
+    cursor.execute("""
+        SELECT taken_at, couple_ids, scores
+        FROM leaderboard_snapshots
+        WHERE taken_at <= %s
+        ORDER BY taken_at DESC
+        LIMIT 1
+    """, (at,))
+    row = cursor.fetchone()
+    return Snapshot(*row) if row else None
+
+
+def load_snapshots_between(cursor, since, until, limit):
+    """since ~ until 사이 스냅샷 중 최근 limit개를 시간순으로"""
+    cursor.execute("""
+        SELECT taken_at, couple_ids, scores
+        FROM leaderboard_snapshots
+        WHERE taken_at >= %s AND taken_at <= %s
+        ORDER BY taken_at DESC
+        LIMIT %s
+    """, (since, until, limit))
+    return [Snapshot(*row) for row in reversed(cursor.fetchall())]
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class UserCache:
+    """
+    프로세스 내 사용자 캐시 (LRU + TTL)
+
+    사용자를 수정하는 라우터가 커밋 직후 invalidate로 바로 지움
+    (다른 워커 프로세스의 변경은 TTL이 지나야 반영됨)
+    """
+
+    def __init__(self, max_size, ttl):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_many(self, user_ids) -> dict:
+        """캐시에 있는 사용자만 {user_id: 사용자 dict}"""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for user_id in user_ids:
+                entry = self._entries.get(user_id)
+                if entry is None:
+                    self.misses += 1
+                    continue
+                expires_at, user = entry
+                if expires_at <= now:
+                    del self._entries[user_id]
+                    self.expirations += 1
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(user_id)
+                found[user_id] = user
+                self.hits += 1
+        return found
+
+    def put_many(self, users: dict):
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for user_id, user in users.items():
+                self._entries[user_id] = (expires_at, user)
+                self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
+
+
+def _create_cache():
+    from config import USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS
+    return UserCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+
+user_cache = _create_cache()
@@ -0,0 +1,76 @@
+from .user_cache import user_cache
+
+USER_COLUMNS = ["user_id", "username", "mbti", "profile_image_url", "heart_rate", "temperature"]
+
+
+def user_from_row(row) -> dict:
+    """USER_COLUMNS 순서의 행 → dict"""
+    return dict(zip(USER_COLUMNS, row))
+
+
+class UserLoader:
+    """
+    요청 단위 사용자 로더
+
+    필요한 user_id를 모아 프로세스 캐시(user_cache)에 없는 것만 WHERE user_id IN (...) 한 번으로 조회하고
+    요청이 끝날 때까지 기억 (없는 사용자는 None으로 기억해 다시 조회하지 않음)
+    반환된 dict는 캐시와 공유되므로 수정하지 말 것
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._users = {}
+        self._pending = set()
+
+    def prime(self, *user_ids):
+        """다음 조회 때 함께 가져올 user_id 등록"""
+        self._pending.update(user_id for user_id in user_ids if user_id not in self._users)
+
+    def _fetch(self, user_ids):
+        found = user_cache.get_many(user_ids)
+        missing = [user_id for user_id in user_ids if user_id not in found]
+        if missing:
+            loaded = self._fetch_from_db(missing)
+            user_cache.put_many(loaded)
+            found.update(loaded)
+        return found
+
+    def _fetch_from_db(self, user_ids):
+        placeholders = ','.join(['%s'] * len(user_ids))
+        cursor = self._connection.cursor()
+        cursor.execute(f"""
+            SELECT {', '.join(USER_COLUMNS)}
+            FROM users
+            WHERE user_id IN ({placeholders})
+        """, user_ids)
+        rows = cursor.fetchall()
+        cursor.close()
+        return {row[0]: user_from_row(row) for row in rows}
+
+    def _flush(self):
+        if not self._pending:
+            return
+        user_ids = sorted(self._pending)
+        self._pending = set()
+        found = self._fetch(user_ids)
+        for user_id in user_ids:
+            self._users[user_id] = found.get(user_id)
+
+    def load_many(self, user_ids) -> dict:
+        """{user_id: 사용자 dict} (없는 사용자는 빠짐)"""
+        self.prime(*user_ids)
+        self._flush()
+        return {
+            user_id: self._users[user_id]
+            for user_id in user_ids
+            if self._users.get(user_id) is not None
+        }
+
+    def load(self, user_id):
+        """사용자 dict, 없으면 None"""
+        return self.load_many([user_id]).get(user_id)
+
+    def clear(self, user_id):
+        """수정/삭제한 사용자는 다음 조회 때 DB에서 다시 읽음"""
+        self._users.pop(user_id, None)
+        user_cache.invalidate(user_id)
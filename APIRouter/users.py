@@ -1,6 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
+import csv
+import json
+from .mbti import is_valid_mbti
+from .leaderboard import leaderboard, ranking_page_cache
+from .user_loader import UserLoader, USER_COLUMNS
+from .export import export_response
+from .pagination import DEFAULT_PAGE_SIZE, clamp_limit
+from .user_cache import user_cache
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -26,13 +35,7 @@ def get_db():
 def create_user(user: UserCreate, connection = Depends(get_db)):
     if not user.username:
         raise HTTPException(status_code=400, detail="사용자 이름을 입력해주세요")
-    valid_mbti = [
-        "ISTJ", "ISFJ", "INFJ", "INTJ",
-        "ISTP", "ISFP", "INFP", "INTP",
-        "ESTP", "ESFP", "ENFP", "ENTP",
-        "ESTJ", "ESFJ", "ENFJ", "ENTJ"
-    ]
-    if user.mbti.upper() not in valid_mbti:
+    if not is_valid_mbti(user.mbti):
         raise HTTPException(status_code=400, detail="올바른 MBTI 유형을 입력해주세요")
     
     try:
@@ -48,20 +51,18 @@ def create_user(user: UserCreate, connection = Depends(get_db)):
         ))
         connection.commit()
         user_id = cursor.lastrowid
-        select_query = "SELECT * FROM users WHERE user_id = %s"
-        cursor.execute(select_query, (user_id,))
-        result = cursor.fetchone()
         cursor.close()
+        result = UserLoader(connection).load(user_id)
         
         if result:
             return {
                 "success": True,
                 "message": "사용자가 생성되었습니다",
                 "user": {
-                    "user_id": result[0],
-                    "username": result[1],
-                    "mbti": result[2],
-                    "profile_image_url": result[3]
+                    "user_id": result["user_id"],
+                    "username": result["username"],
+                    "mbti": result["mbti"],
+                    "profile_image_url": result["profile_image_url"]
                 }
             }
         
@@ -69,52 +70,275 @@ def create_user(user: UserCreate, connection = Depends(get_db)):
         connection.rollback()
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
 
-@router.get("")
-def get_users(connection = Depends(get_db)):
+# 한 번에 INSERT/커밋하는 행 수와 크기
+# pymysql executemany는 문장 길이(max_stmt_length, 1MB)를 넘으면 여러 문장으로 나누므로
+# 이스케이프 후 최대 크기(원본의 2배)가 그보다 작게 묶어 항상 다중 행 INSERT 한 문장이 되게 함
+# (한 문장의 AUTO_INCREMENT는 연속이므로 lastrowid부터 auto_increment_increment 간격으로 id가 배정됨)
+IMPORT_CHUNK_SIZE = 200
+IMPORT_CHUNK_BYTES = 400_000
+MAX_IMPORT_ROWS = 10000
+
+
+async def iter_lines(request: Request):
+    """요청 본문을 받는 대로 한 줄씩 bytes로 (전체를 메모리에 올리지 않음)"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if buffer:
+        yield buffer.rstrip(b"\r")
+
+
+def decode_line(line: bytes) -> str:
+    """UTF-8이 아니면 ValueError (UnicodeDecodeError)"""
+    return line.decode("utf-8-sig")
+
+
+def parse_import_row(line: bytes, import_format: str, header):
+    """한 줄 → 사용자 dict (형식이 잘못되면 ValueError)"""
     try:
-        cursor = connection.cursor()
-        
-        select_query = "SELECT * FROM users"
-        cursor.execute(select_query)
-        results = cursor.fetchall()
+        text = decode_line(line)
+    except UnicodeDecodeError:
+        raise ValueError("UTF-8 형식이 아닙니다")
+    if import_format == "csv":
+        values = next(csv.reader([text]))
+        return dict(zip(header, values))
+    row = json.loads(text)
+    if not isinstance(row, dict):
+        raise ValueError("JSON 객체가 아닙니다")
+    return row
+
+
+def validate_import_row(row: dict):
+    """(username, mbti, profile_image_url) 또는 ValueError"""
+    username = row.get("username")
+    mbti = row.get("mbti")
+    profile_image_url = row.get("profile_image_url")
+    if not isinstance(username, str) or not username.strip():
+        raise ValueError("사용자 이름을 입력해주세요")
+    if not isinstance(mbti, str) or not is_valid_mbti(mbti.strip()):
+        raise ValueError("올바른 MBTI 유형을 입력해주세요")
+    if profile_image_url is not None and not isinstance(profile_image_url, str):
+        raise ValueError("profile_image_url은 문자열이어야 합니다")
+    return username.strip(), mbti.strip().upper(), profile_image_url or None
+
+
+def import_row_size(values) -> int:
+    """이스케이프 후 INSERT 문장에서 차지할 수 있는 최대 바이트 수"""
+    return sum(2 * len(value.encode()) + 4 for value in values if value) + 16
+
+
+def fetch_auto_increment_step(connection) -> int:
+    cursor = connection.cursor()
+    cursor.execute("SELECT @@auto_increment_increment")
+    step = cursor.fetchone()[0]
+    cursor.close()
+    return int(step)
+
+
+def insert_import_chunk(connection, chunk, step):
+    """chunk: [(결과 dict, 값 tuple), ...] 를 한 트랜잭션으로 추가하고 결과에 user_id 기록"""
+    cursor = connection.cursor()
+    try:
+        cursor.executemany("""
+            INSERT INTO users (username, mbti, profile_image_url)
+            VALUES (%s, %s, %s)
+        """, [values for _, values in chunk])
+        if cursor.rowcount != len(chunk):
+            raise RuntimeError(f"{len(chunk)}행 중 {cursor.rowcount}행만 추가되었습니다")
+        first_id = cursor.lastrowid
+        connection.commit()
+        for offset, (result, _) in enumerate(chunk):
+            result["success"] = True
+            result["user_id"] = first_id + offset * step
+    except Exception as e:
+        connection.rollback()
+        for result, _ in chunk:
+            result["success"] = False
+            result["error"] = f"데이터베이스 오류: {str(e)}"
+    finally:
         cursor.close()
+
+
+@router.post("/import")
+async def import_users(request: Request, format: Optional[str] = None, connection = Depends(get_db)):
+    """
+    사용자 일괄 등록 (CSV 또는 NDJSON 본문)
+    
+    CSV는 첫 줄에 username,mbti,profile_image_url 헤더, NDJSON은 한 줄에 객체 하나
+    형식은 format(csv/ndjson) 또는 Content-Type으로 판단
+    행마다 MBTI를 검사하고, 올바른 행은 IMPORT_CHUNK_SIZE개(또는 IMPORT_CHUNK_BYTES)씩 executemany + 커밋
+    결과는 줄 번호별 success와 user_id(또는 error)
+    MAX_IMPORT_ROWS를 넘으면 그 뒤는 읽지 않고 truncated와 error로 알림 (앞부분은 반영됨)
+    """
+    import_format = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if import_format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format은 csv 또는 ndjson이어야 합니다")
+    
+    try:
+        step = await run_in_threadpool(fetch_auto_increment_step, connection)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+    
+    results = []
+    chunk = []
+    chunk_bytes = 0
+    header = None
+    line_number = 0
+    truncated = False
+    
+    async for line in iter_lines(request):
+        line_number += 1
+        if not line.strip():
+            continue
+        if import_format == "csv" and header is None:
+            try:
+                header = [name.strip() for name in next(csv.reader([decode_line(line)]))]
+            except UnicodeDecodeError:
+                raise HTTPException(status_code=400, detail="CSV 헤더가 UTF-8 형식이 아닙니다")
+            if "username" not in header or "mbti" not in header:
+                raise HTTPException(status_code=400, detail="CSV 헤더에 username, mbti가 필요합니다")
+            continue
+        if len(results) >= MAX_IMPORT_ROWS:
+            truncated = True
+            break
         
-        users = [
-            {
-                "user_id": row[0],
-                "username": row[1],
-                "mbti": row[2],
-                "profile_image_url": row[3]
-            }
-            for row in results
-        ]
-        
-        return {
-            "count": len(users),
-            "users": users
-        }
+        result = {"line": line_number}
+        results.append(result)
+        try:
+            values = validate_import_row(parse_import_row(line, import_format, header))
+        except (ValueError, StopIteration) as e:
+            result["success"] = False
+            result["error"] = str(e) or "형식이 올바르지 않습니다"
+            continue
         
+        size = import_row_size(values)
+        if chunk and chunk_bytes + size > IMPORT_CHUNK_BYTES:
+            await run_in_threadpool(insert_import_chunk, connection, chunk, step)
+            chunk, chunk_bytes = [], 0
+        chunk.append((result, values))
+        chunk_bytes += size
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await run_in_threadpool(insert_import_chunk, connection, chunk, step)
+            chunk, chunk_bytes = [], 0
+    
+    if chunk:
+        await run_in_threadpool(insert_import_chunk, connection, chunk, step)
+    
+    created = sum(1 for result in results if result["success"])
+    response = {
+        "success": True,
+        "created": created,
+        "failed": len(results) - created,
+        "truncated": truncated,
+        "results": results
+    }
+    if truncated:
+        response["error"] = f"한 번에 최대 {MAX_IMPORT_ROWS}명까지 등록할 수 있어 {line_number}번째 줄부터는 처리하지 않았습니다"
+    return response
+
+# 목록에서 fields=로 고를 수 있는 컬럼 (user_id는 커서로 쓰이므로 항상 포함)
+LIST_FIELDS = ["user_id", "username", "mbti", "profile_image_url"]
+
+
+def parse_fields(fields: Optional[str]) -> list:
+    if not fields:
+        return LIST_FIELDS
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in LIST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 필드: {', '.join(unknown)} (가능: {', '.join(LIST_FIELDS)})")
+    return ["user_id"] + [field for field in LIST_FIELDS[1:] if field in requested]
+
+
+def list_users(connection, mbti: Optional[str], limit: int, after_user_id: Optional[int], fields: Optional[str]) -> dict:
+    """
+    user_id 순 키셋 페이지 (필요한 컬럼만 조회)
+
+    mbti가 있으면 (mbti, user_id) 인덱스로 범위 조회
+    """
+    columns = parse_fields(fields)
+    limit = clamp_limit(limit)
+    
+    conditions = []
+    params = []
+    if mbti:
+        conditions.append("mbti = %s")
+        params.append(mbti)
+    if after_user_id is not None:
+        conditions.append("user_id > %s")
+        params.append(after_user_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit + 1)
+    
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"""
+            SELECT {', '.join(columns)}
+            FROM users
+            {where}
+            ORDER BY user_id
+            LIMIT %s
+        """, params)
+        results = cursor.fetchall()
+        cursor.close()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+    
+    has_more = len(results) > limit
+    results = results[:limit]
+    users = [dict(zip(columns, row)) for row in results]
+    
+    return {
+        "count": len(users),
+        "users": users,
+        "next_after_user_id": results[-1][0] if has_more else None
+    }
+
+@router.get("")
+def get_users(
+    limit: int = DEFAULT_PAGE_SIZE,
+    after_user_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    connection = Depends(get_db)
+):
+    """
+    사용자 목록 (user_id 순, limit명씩)
+    
+    다음 페이지는 응답의 next_after_user_id를 after_user_id로 전달
+    fields=username,mbti 처럼 필요한 필드만 요청 가능 (user_id는 항상 포함)
+    """
+    return list_users(connection, None, limit, after_user_id, fields)
+
+@router.get("/export")
+def export_users(format: str = "ndjson", mbti: Optional[str] = None):
+    """사용자 전체 내보내기 (NDJSON/CSV 스트리밍, 메모리 사용량은 테이블 크기와 무관)"""
+    query = """
+        SELECT user_id, username, mbti, profile_image_url, heart_rate, temperature
+        FROM users
+    """
+    params = ()
+    if mbti:
+        query += " WHERE mbti = %s"
+        params = (mbti.upper(),)
+    query += " ORDER BY user_id"
+    return export_response(query, params, USER_COLUMNS, format, "users")
 
 @router.get("/{user_id}")
 def get_user(user_id: int, connection = Depends(get_db)):
     try:
-        cursor = connection.cursor()
+        user = UserLoader(connection).load(user_id)
         
-        select_query = "SELECT * FROM users WHERE user_id = %s"
-        cursor.execute(select_query, (user_id,))
-        result = cursor.fetchone()
-        cursor.close()
-        
-        if not result:
+        if not user:
             raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다")
         
         return {
-            "user_id": result[0],
-            "username": result[1],
-            "mbti": result[2],
-            "profile_image_url": result[3]
+            "user_id": user["user_id"],
+            "username": user["username"],
+            "mbti": user["mbti"],
+            "profile_image_url": user["profile_image_url"]
         }
         
     except HTTPException:
@@ -123,43 +347,26 @@ def get_user(user_id: int, connection = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
 
 @router.get("/mbti/{mbti}")
-def get_users_by_mbti(mbti: str, connection = Depends(get_db)):
-    try:
-        cursor = connection.cursor()
-        
-        select_query = "SELECT * FROM users WHERE mbti = %s"
-        cursor.execute(select_query, (mbti.upper(),))
-        results = cursor.fetchall()
-        cursor.close()
-        
-        users = [
-            {
-                "user_id": row[0],
-                "username": row[1],
-                "mbti": row[2],
-                "profile_image_url": row[3]
-            }
-            for row in results
-        ]
-        
-        return {
-            "mbti": mbti.upper(),
-            "count": len(users),
-            "users": users
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+def get_users_by_mbti(
+    mbti: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after_user_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    connection = Depends(get_db)
+):
+    """MBTI별 사용자 목록 (get_users와 같은 페이지/필드 옵션)"""
+    return {
+        "mbti": mbti.upper(),
+        **list_users(connection, mbti.upper(), limit, after_user_id, fields)
+    }
 
 @router.put("/{user_id}")
 def update_user(user_id: int, user_update: UserUpdate, connection = Depends(get_db)):
     try:
-        cursor = connection.cursor()
-        check_query = "SELECT * FROM users WHERE user_id = %s"
-        cursor.execute(check_query, (user_id,))
-        if not cursor.fetchone():
-            cursor.close()
+        users = UserLoader(connection)
+        if not users.load(user_id):
             raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다")
+        cursor = connection.cursor()
         update_fields = []
         update_values = []
         
@@ -168,6 +375,9 @@ def update_user(user_id: int, user_update: UserUpdate, connection = Depends(get_
             update_values.append(user_update.username)
         
         if user_update.mbti:
+            if not is_valid_mbti(user_update.mbti):
+                cursor.close()
+                raise HTTPException(status_code=400, detail="올바른 MBTI 유형을 입력해주세요")
             update_fields.append("mbti = %s")
             update_values.append(user_update.mbti.upper())
         
@@ -181,19 +391,20 @@ def update_user(user_id: int, user_update: UserUpdate, connection = Depends(get_
         update_query = f"UPDATE users SET {', '.join(update_fields)} WHERE user_id = %s"
         cursor.execute(update_query, tuple(update_values))
         connection.commit()
-        select_query = "SELECT * FROM users WHERE user_id = %s"
-        cursor.execute(select_query, (user_id,))
-        result = cursor.fetchone()
+        # 랭킹 페이지에 사용자 이름/MBTI/프로필이 포함되어 있음
+        ranking_page_cache.invalidate()
         cursor.close()
+        users.clear(user_id)
+        user = users.load(user_id)
         
         return {
             "success": True,
             "message": "사용자 정보가 수정되었습니다",
             "user": {
-                "user_id": result[0],
-                "username": result[1],
-                "mbti": result[2],
-                "profile_image_url": result[3]
+                "user_id": user["user_id"],
+                "username": user["username"],
+                "mbti": user["mbti"],
+                "profile_image_url": user["profile_image_url"]
             }
         }
         
@@ -206,16 +417,16 @@ def update_user(user_id: int, user_update: UserUpdate, connection = Depends(get_
 @router.delete("/{user_id}")
 def delete_user(user_id: int, connection = Depends(get_db)):
     try:
-        cursor = connection.cursor()
-        check_query = "SELECT * FROM users WHERE user_id = %s"
-        cursor.execute(check_query, (user_id,))
-        if not cursor.fetchone():
-            cursor.close()
+        if not UserLoader(connection).load(user_id):
             raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다")
+        cursor = connection.cursor()
         delete_query = "DELETE FROM users WHERE user_id = %s"
         cursor.execute(delete_query, (user_id,))
         connection.commit()
         cursor.close()
+        user_cache.invalidate(user_id)
+        # 커플이 함께 삭제됐을 수 있으므로 랭킹을 다시 로드
+        leaderboard.invalidate()
         
         return {
             "success": True,
@@ -228,6 +439,11 @@ def delete_user(user_id: int, connection = Depends(get_db)):
         connection.rollback()
         raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
 
+@router.get("/cache/stats")
+def get_user_cache_stats():
+    """사용자 캐시 적중/미스/제거 통계 (이 워커 프로세스 기준)"""
+    return user_cache.stats()
+
 @router.get("/stats/mbti")
 def get_mbti_stats(connection = Depends(get_db)):
     try:
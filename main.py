@@ -1,8 +1,40 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from .APIRouter import users, compatibility, confessions, couples, fated_match
+from .APIRouter.leaderboard import leaderboard
+from .APIRouter.schema import schema
+from .APIRouter.snapshots import snapshot_recorder
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        schema.refresh_from_db()
+        print(f"DB 스키마 확인 완료: {schema.as_dict()}")
+        missing = schema.missing_indexes()
+        if missing:
+            print(f"경고: UNIQUE 인덱스 없음 ({', '.join(missing)}) - migrations/007_pair_unique_keys.sql 적용 전에는 중복을 조회로 확인")
+    except Exception as e:
+        print(f"DB 스키마 확인 실패 (첫 조회 시 다시 시도): {e}")
+    try:
+        leaderboard.load_from_db()
+        print(f"커플 랭킹 로드 완료: {len(leaderboard)}팀")
+    except Exception as e:
+        # DB가 아직 준비되지 않았으면 첫 조회 시 로드
+        print(f"커플 랭킹 로드 실패 (첫 조회 시 다시 시도): {e}")
+    
+    from config import LEADERBOARD_SNAPSHOT_SECONDS
+    snapshot_task = None
+    if LEADERBOARD_SNAPSHOT_SECONDS > 0:
+        snapshot_task = asyncio.create_task(snapshot_recorder.run(LEADERBOARD_SNAPSHOT_SECONDS))
+    yield
+    if snapshot_task:
+        snapshot_task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +52,15 @@ app.include_router(fated_match.router)
 def root():
     return {"message": "FastAPI 서버가 실행중입니다 (reach_you DB 연결)"}
 
+@app.post("/api/schema/refresh")
+def refresh_schema():
+    """스키마 변경(마이그레이션) 후 기능 목록 다시 읽기"""
+    try:
+        schema.refresh_from_db()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"데이터베이스 오류: {str(e)}")
+    return {"success": True, "schema": schema.as_dict()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
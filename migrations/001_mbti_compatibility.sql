@@ -0,0 +1,28 @@
+-- MBTI 궁합 점수표 (fated_match DB 점수 계산 모드에서 사용)
+-- APIRouter/mbti.py의 MBTI_SCORES와 같은 값이어야 함
+-- 비교는 대소문자를 구분 (Python 코드와 동일)
+
+CREATE TABLE IF NOT EXISTS mbti_compatibility (
+    mbti1 CHAR(4) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+    mbti2 CHAR(4) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+    score TINYINT UNSIGNED NOT NULL,
+    PRIMARY KEY (mbti1, mbti2)
+);
+
+REPLACE INTO mbti_compatibility (mbti1, mbti2, score) VALUES
+    ('ISTJ', 'ISTJ', 75), ('ISTJ', 'ISFJ', 75), ('ISTJ', 'INFJ', 50), ('ISTJ', 'INTJ', 50), ('ISTJ', 'ISTP', 86), ('ISTJ', 'ISFP', 86), ('ISTJ', 'INFP', 61), ('ISTJ', 'INTP', 61), ('ISTJ', 'ESTP', 89), ('ISTJ', 'ESFP', 100), ('ISTJ', 'ENFP', 75), ('ISTJ', 'ENTP', 75), ('ISTJ', 'ESTJ', 89), ('ISTJ', 'ESFJ', 89), ('ISTJ', 'ENFJ', 64), ('ISTJ', 'ENTJ', 64),
+    ('ISFJ', 'ISTJ', 75), ('ISFJ', 'ISFJ', 75), ('ISFJ', 'INFJ', 50), ('ISFJ', 'INTJ', 50), ('ISFJ', 'ISTP', 86), ('ISFJ', 'ISFP', 86), ('ISFJ', 'INFP', 61), ('ISFJ', 'INTP', 61), ('ISFJ', 'ESTP', 89), ('ISFJ', 'ESFP', 100), ('ISFJ', 'ENFP', 75), ('ISFJ', 'ENTP', 75), ('ISFJ', 'ESTJ', 89), ('ISFJ', 'ESFJ', 89), ('ISFJ', 'ENFJ', 64), ('ISFJ', 'ENTJ', 64),
+    ('INFJ', 'ISTJ', 50), ('INFJ', 'ISFJ', 50), ('INFJ', 'INFJ', 75), ('INFJ', 'INTJ', 75), ('INFJ', 'ISTP', 61), ('INFJ', 'ISFP', 61), ('INFJ', 'INFP', 86), ('INFJ', 'INTP', 86), ('INFJ', 'ESTP', 75), ('INFJ', 'ESFP', 75), ('INFJ', 'ENFP', 100), ('INFJ', 'ENTP', 89), ('INFJ', 'ESTJ', 64), ('INFJ', 'ESFJ', 64), ('INFJ', 'ENFJ', 89), ('INFJ', 'ENTJ', 89),
+    ('INTJ', 'ISTJ', 50), ('INTJ', 'ISFJ', 50), ('INTJ', 'INFJ', 75), ('INTJ', 'INTJ', 75), ('INTJ', 'ISTP', 61), ('INTJ', 'ISFP', 61), ('INTJ', 'INFP', 86), ('INTJ', 'INTP', 86), ('INTJ', 'ESTP', 75), ('INTJ', 'ESFP', 75), ('INTJ', 'ENFP', 100), ('INTJ', 'ENTP', 100), ('INTJ', 'ESTJ', 64), ('INTJ', 'ESFJ', 64), ('INTJ', 'ENFJ', 89), ('INTJ', 'ENTJ', 89),
+    ('ISTP', 'ISTJ', 86), ('ISTP', 'ISFJ', 86), ('ISTP', 'INFJ', 61), ('ISTP', 'INTJ', 61), ('ISTP', 'ISTP', 75), ('ISTP', 'ISFP', 75), ('ISTP', 'INFP', 50), ('ISTP', 'INTP', 50), ('ISTP', 'ESTP', 89), ('ISTP', 'ESFP', 89), ('ISTP', 'ENFP', 64), ('ISTP', 'ENTP', 64), ('ISTP', 'ESTJ', 100), ('ISTP', 'ESFJ', 100), ('ISTP', 'ENFJ', 75), ('ISTP', 'ENTJ', 75),
+    ('ISFP', 'ISTJ', 86), ('ISFP', 'ISFJ', 86), ('ISFP', 'INFJ', 61), ('ISFP', 'INTJ', 61), ('ISFP', 'ISTP', 75), ('ISFP', 'ISFP', 75), ('ISFP', 'INFP', 50), ('ISFP', 'INTP', 50), ('ISFP', 'ESTP', 89), ('ISFP', 'ESFP', 89), ('ISFP', 'ENFP', 64), ('ISFP', 'ENTP', 64), ('ISFP', 'ESTJ', 89), ('ISFP', 'ESFJ', 100), ('ISFP', 'ENFJ', 75), ('ISFP', 'ENTJ', 75),
+    ('INFP', 'ISTJ', 61), ('INFP', 'ISFJ', 61), ('INFP', 'INFJ', 86), ('INFP', 'INTJ', 86), ('INFP', 'ISTP', 50), ('INFP', 'ISFP', 50), ('INFP', 'INFP', 75), ('INFP', 'INTP', 75), ('INFP', 'ESTP', 64), ('INFP', 'ESFP', 64), ('INFP', 'ENFP', 89), ('INFP', 'ENTP', 89), ('INFP', 'ESTJ', 75), ('INFP', 'ESFJ', 75), ('INFP', 'ENFJ', 100), ('INFP', 'ENTJ', 89),
+    ('INTP', 'ISTJ', 61), ('INTP', 'ISFJ', 61), ('INTP', 'INFJ', 86), ('INTP', 'INTJ', 86), ('INTP', 'ISTP', 50), ('INTP', 'ISFP', 50), ('INTP', 'INFP', 75), ('INTP', 'INTP', 75), ('INTP', 'ESTP', 64), ('INTP', 'ESFP', 64), ('INTP', 'ENFP', 89), ('INTP', 'ENTP', 89), ('INTP', 'ESTJ', 75), ('INTP', 'ESFJ', 75), ('INTP', 'ENFJ', 100), ('INTP', 'ENTJ', 100),
+    ('ESTP', 'ISTJ', 100), ('ESTP', 'ISFJ', 100), ('ESTP', 'INFJ', 75), ('ESTP', 'INTJ', 75), ('ESTP', 'ISTP', 89), ('ESTP', 'ISFP', 89), ('ESTP', 'INFP', 64), ('ESTP', 'INTP', 64), ('ESTP', 'ESTP', 75), ('ESTP', 'ESFP', 60), ('ESTP', 'ENFP', 100), ('ESTP', 'ENTP', 100), ('ESTP', 'ESTJ', 100), ('ESTP', 'ESFJ', 100), ('ESTP', 'ENFJ', 89), ('ESTP', 'ENTJ', 89),
+    ('ESFP', 'ISTJ', 100), ('ESFP', 'ISFJ', 100), ('ESFP', 'INFJ', 75), ('ESFP', 'INTJ', 75), ('ESFP', 'ISTP', 89), ('ESFP', 'ISFP', 89), ('ESFP', 'INFP', 64), ('ESFP', 'INTP', 64), ('ESFP', 'ESTP', 60), ('ESFP', 'ESFP', 75), ('ESFP', 'ENFP', 100), ('ESFP', 'ENTP', 100), ('ESFP', 'ESTJ', 100), ('ESFP', 'ESFJ', 100), ('ESFP', 'ENFJ', 89), ('ESFP', 'ENTJ', 89),
+    ('ENFP', 'ISTJ', 75), ('ENFP', 'ISFJ', 75), ('ENFP', 'INFJ', 100), ('ENFP', 'INTJ', 100), ('ENFP', 'ISTP', 64), ('ENFP', 'ISFP', 64), ('ENFP', 'INFP', 89), ('ENFP', 'INTP', 89), ('ENFP', 'ESTP', 100), ('ENFP', 'ESFP', 100), ('ENFP', 'ENFP', 75), ('ENFP', 'ENTP', 60), ('ENFP', 'ESTJ', 89), ('ENFP', 'ESFJ', 89), ('ENFP', 'ENFJ', 100), ('ENFP', 'ENTJ', 100),
+    ('ENTP', 'ISTJ', 75), ('ENTP', 'ISFJ', 75), ('ENTP', 'INFJ', 100), ('ENTP', 'INTJ', 100), ('ENTP', 'ISTP', 64), ('ENTP', 'ISFP', 64), ('ENTP', 'INFP', 89), ('ENTP', 'INTP', 89), ('ENTP', 'ESTP', 100), ('ENTP', 'ESFP', 100), ('ENTP', 'ENFP', 60), ('ENTP', 'ENTP', 75), ('ENTP', 'ESTJ', 89), ('ENTP', 'ESFJ', 89), ('ENTP', 'ENFJ', 100), ('ENTP', 'ENTJ', 100),
+    ('ESTJ', 'ISTJ', 89), ('ESTJ', 'ISFJ', 89), ('ESTJ', 'INFJ', 64), ('ESTJ', 'INTJ', 64), ('ESTJ', 'ISTP', 100), ('ESTJ', 'ISFP', 100), ('ESTJ', 'INFP', 75), ('ESTJ', 'INTP', 75), ('ESTJ', 'ESTP', 100), ('ESTJ', 'ESFP', 60), ('ESTJ', 'ENFP', 89), ('ESTJ', 'ENTP', 89), ('ESTJ', 'ESTJ', 75), ('ESTJ', 'ESFJ', 100), ('ESTJ', 'ENFJ', 100), ('ESTJ', 'ENTJ', 100),
+    ('ESFJ', 'ISTJ', 89), ('ESFJ', 'ISFJ', 89), ('ESFJ', 'INFJ', 64), ('ESFJ', 'INTJ', 64), ('ESFJ', 'ISTP', 100), ('ESFJ', 'ISFP', 100), ('ESFJ', 'INFP', 75), ('ESFJ', 'INTP', 75), ('ESFJ', 'ESTP', 100), ('ESFJ', 'ESFP', 100), ('ESFJ', 'ENFP', 89), ('ESFJ', 'ENTP', 89), ('ESFJ', 'ESTJ', 60), ('ESFJ', 'ESFJ', 75), ('ESFJ', 'ENFJ', 100), ('ESFJ', 'ENTJ', 100),
+    ('ENFJ', 'ISTJ', 64), ('ENFJ', 'ISFJ', 64), ('ENFJ', 'INFJ', 89), ('ENFJ', 'INTJ', 89), ('ENFJ', 'ISTP', 75), ('ENFJ', 'ISFP', 75), ('ENFJ', 'INFP', 100), ('ENFJ', 'INTP', 100), ('ENFJ', 'ESTP', 89), ('ENFJ', 'ESFP', 89), ('ENFJ', 'ENFP', 100), ('ENFJ', 'ENTP', 100), ('ENFJ', 'ESTJ', 100), ('ENFJ', 'ESFJ', 100), ('ENFJ', 'ENFJ', 75), ('ENFJ', 'ENTJ', 60),
+    ('ENTJ', 'ISTJ', 64), ('ENTJ', 'ISFJ', 64), ('ENTJ', 'INFJ', 89), ('ENTJ', 'INTJ', 89), ('ENTJ', 'ISTP', 75), ('ENTJ', 'ISFP', 75), ('ENTJ', 'INFP', 100), ('ENTJ', 'INTP', 100), ('ENTJ', 'ESTP', 89), ('ENTJ', 'ESFP', 89), ('ENTJ', 'ENFP', 60), ('ENTJ', 'ENTP', 100), ('ENTJ', 'ESTJ', 100), ('ENTJ', 'ESFJ', 100), ('ENTJ', 'ENFJ', 100), ('ENTJ', 'ENTJ', 75);
@@ -0,0 +1,30 @@
+-- 커플 별점 합계/개수를 couple_ranking에 저장 (랭킹 조회 시 집계 제거)
+-- add_couple_rating이 별점 INSERT와 같은 트랜잭션에서 갱신
+
+ALTER TABLE couple_ranking
+    ADD COLUMN rating_sum INT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN rating_count INT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN average_rating DECIMAL(7, 4)
+        GENERATED ALWAYS AS (IF(rating_count = 0, 0, rating_sum / rating_count)) STORED;
+
+-- 랭킹 정렬 순서 그대로의 인덱스 (정렬 없이 LIMIT/OFFSET 구간만 읽음)
+CREATE INDEX idx_couple_ranking_order
+    ON couple_ranking (average_rating DESC, rating_count DESC, score DESC, couple_id, user_a_id, user_b_id);
+
+-- 기존 별점 반영 (couple_ratings 테이블이 있을 때만 실행, 없으면 별점 API가 501이라 반영할 값도 없음)
+SET @backfill_ratings = IF(
+    (SELECT COUNT(*) FROM information_schema.tables
+     WHERE table_schema = DATABASE() AND table_name = 'couple_ratings') > 0,
+    'UPDATE couple_ranking cr
+     JOIN (
+         SELECT couple_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count
+         FROM couple_ratings
+         GROUP BY couple_id
+     ) agg ON agg.couple_id = cr.couple_id
+     SET cr.rating_sum = agg.rating_sum,
+         cr.rating_count = agg.rating_count',
+    'DO 0'
+);
+PREPARE backfill_ratings FROM @backfill_ratings;
+EXECUTE backfill_ratings;
+DEALLOCATE PREPARE backfill_ratings;
@@ -0,0 +1,11 @@
+-- 원래 궁합 점수를 score와 별도로 저장 (별점 반영 시 누적 오차 없이 다시 계산)
+-- score = base_score * 0.8 + 평균 별점 * 4 (별점이 없으면 score = base_score)
+
+ALTER TABLE couple_ranking
+    ADD COLUMN base_score DECIMAL(6, 2) NULL AFTER score;
+
+-- 기존 커플: 별점이 이미 반영된 커플은 원래 점수를 복원할 수 없으므로 현재 점수를 기준으로 사용
+UPDATE couple_ranking SET base_score = score WHERE base_score IS NULL;
+
+ALTER TABLE couple_ranking
+    MODIFY COLUMN base_score DECIMAL(6, 2) NOT NULL;
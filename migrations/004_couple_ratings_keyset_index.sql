@@ -0,0 +1,4 @@
+-- 커플 상세의 별점 목록 키셋 페이지네이션 (created_at DESC, rating_id DESC)
+
+CREATE INDEX idx_couple_ratings_couple_created
+    ON couple_ratings (couple_id, created_at, rating_id);
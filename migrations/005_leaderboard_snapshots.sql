@@ -0,0 +1,12 @@
+-- 커플 랭킹 스냅샷 (APIRouter/snapshots.py)
+-- couple_ids: 1등부터 순서대로 couple_id (uint32 little-endian 배열)
+-- scores: 같은 순서의 score * 100 (int32 little-endian 배열)
+
+CREATE TABLE IF NOT EXISTS leaderboard_snapshots (
+    snapshot_id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    taken_at DATETIME NOT NULL,
+    couple_count INT UNSIGNED NOT NULL,
+    couple_ids MEDIUMBLOB NOT NULL,
+    scores MEDIUMBLOB NOT NULL,
+    KEY idx_leaderboard_snapshots_taken_at (taken_at)
+);
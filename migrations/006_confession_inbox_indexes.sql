@@ -0,0 +1,8 @@
+-- 받은/보낸 고백 목록 키셋 페이지네이션 (created_at DESC, confession_id DESC)
+-- 끝의 status는 상태 필터와 상태별 개수 집계를 인덱스만으로 처리하기 위함
+
+CREATE INDEX idx_confessions_to_created
+    ON confessions (to_user_id, created_at, confession_id, status);
+
+CREATE INDEX idx_confessions_from_created
+    ON confessions (from_user_id, created_at, confession_id, status);
@@ -0,0 +1,14 @@
+-- 커플/대기 중 고백 중복을 UNIQUE 인덱스로 막음 (동시 요청에도 DB가 거부)
+-- 이미 중복 행이 있으면 인덱스 생성이 실패하므로 먼저 정리해야 함
+
+-- 커플: 순서와 관계없는 (작은 id, 큰 id)
+ALTER TABLE couple_ranking
+    ADD COLUMN pair_low INT GENERATED ALWAYS AS (LEAST(user_a_id, user_b_id)) STORED,
+    ADD COLUMN pair_high INT GENERATED ALWAYS AS (GREATEST(user_a_id, user_b_id)) STORED,
+    ADD UNIQUE KEY uq_couple_ranking_pair (pair_low, pair_high);
+
+-- 고백: 보내는 사람 → 받는 사람 방향으로 pending은 하나만
+-- (pending이 아니면 NULL이라 UNIQUE 검사에서 제외)
+ALTER TABLE confessions
+    ADD COLUMN pending_key TINYINT GENERATED ALWAYS AS (IF(status = 'pending', 1, NULL)) STORED,
+    ADD UNIQUE KEY uq_confessions_pending (from_user_id, to_user_id, pending_key);
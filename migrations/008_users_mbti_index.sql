@@ -0,0 +1,3 @@
+-- MBTI별 사용자 목록 키셋 페이지네이션 (WHERE mbti = ? AND user_id > ? ORDER BY user_id)
+
+CREATE INDEX idx_users_mbti_user ON users (mbti, user_id);
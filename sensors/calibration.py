@@ -0,0 +1,44 @@
+import json
+import os
+
+# 벤치마크(sensors/spi_benchmark.py)가 저장하는 보정 프로파일 경로
+CALIBRATION_PATH = os.getenv(
+    "SENSOR_CALIBRATION_PATH",
+    os.path.join(os.path.dirname(__file__), "calibration.json")
+)
+
+# 프로파일이 없을 때 사용하는 기본값 (기존 하드코딩 값)
+DEFAULT_PROFILE = {
+    "max_speed_hz": 1350000,
+    "sleep_interval": 0.01,  # 샘플 사이 대기 시간 (초)
+    "sample_period": 0.01,  # 실제 샘플 간격 (초) - 심박 간격 계산에 사용
+    "strategy": "sleep"
+}
+
+
+def load_calibration(path=None):
+    """보정 프로파일 로드 (없거나 읽을 수 없으면 기본값)"""
+    profile = dict(DEFAULT_PROFILE)
+    path = path or CALIBRATION_PATH
+    
+    if not os.path.exists(path):
+        return profile
+    
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"보정 프로파일 읽기 실패, 기본값 사용: {e}")
+        return profile
+    
+    for key in DEFAULT_PROFILE:
+        if key in saved:
+            profile[key] = saved[key]
+    return profile
+
+
+def save_calibration(profile, path=None):
+    path = path or CALIBRATION_PATH
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    return path
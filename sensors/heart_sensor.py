@@ -1,12 +1,108 @@
-import spidev
 import time
+from sensors.calibration import load_calibration
+
+ADC_MAX = 1023  # MCP3008 10bit
+
+# 신호 품질 기준 (test1.py 측정 결과 기준)
+MIN_SIGNAL_RANGE = 100  # 이보다 작으면 손가락이 없거나 신호가 너무 약함
+MAX_SIGNAL_RANGE = 700  # 이보다 크면 노이즈/움직임이 심함
+MAX_CLIPPED_RATIO = 0.1  # ADC 최소/최대값에 붙은 샘플 비율
+QUALITY_WINDOW = 2.0  # 품질 판정에 사용하는 측정 초반 구간 (초)
+
+
+class SignalQualityError(Exception):
+    """측정 초반 신호 품질 불량으로 측정을 중단할 때 발생"""
+    def __init__(self, reason, message, stats=None):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+        self.stats = stats or {}
+
+    def to_dict(self):
+        return {
+            "reason": self.reason,
+            "message": self.message,
+            "signal": self.stats
+        }
+
+
+class SignalQualityMonitor:
+    """
+    샘플을 하나씩 받아 신호 품질을 누적 계산 (전체 샘플 저장 없이)
+    
+    reason:
+        no_finger: 신호 변화폭이 MIN_SIGNAL_RANGE 미만
+        clipped: ADC 최소/최대값에 붙은 샘플이 MAX_CLIPPED_RATIO 이상
+        too_noisy: 신호 변화폭이 MAX_SIGNAL_RANGE 초과 (경고만, 측정은 계속)
+    """
+    def __init__(self):
+        self.count = 0
+        self.clipped = 0
+        self.minimum = None
+        self.maximum = None
+
+    def update(self, value):
+        self.count += 1
+        if value <= 0 or value >= ADC_MAX:
+            self.clipped += 1
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def stats(self):
+        signal_range = (self.maximum - self.minimum) if self.count else 0
+        return {
+            "samples": self.count,
+            "min": self.minimum,
+            "max": self.maximum,
+            "range": signal_range,
+            "clipped_ratio": round(self.clipped / self.count, 3) if self.count else 0.0
+        }
+
+    def evaluate(self):
+        """측정을 중단해야 하면 SignalQualityError, 아니면 경고 reason 또는 None 반환"""
+        stats = self.stats()
+        if self.count == 0:
+            raise SignalQualityError("no_signal", "센서 값을 읽지 못했습니다", stats)
+        if stats["clipped_ratio"] >= MAX_CLIPPED_RATIO:
+            raise SignalQualityError(
+                "clipped",
+                "신호가 포화되었습니다. 손가락을 너무 세게 누르지 마세요",
+                stats
+            )
+        if stats["range"] < MIN_SIGNAL_RANGE:
+            raise SignalQualityError(
+                "no_finger",
+                "신호가 너무 약합니다. 손가락을 센서에 밀착시켜 주세요",
+                stats
+            )
+        if stats["range"] > MAX_SIGNAL_RANGE:
+            return "too_noisy"
+        return None
+
 
 class HeartRateSensor:
-    def __init__(self, channel=1, spi_bus=0, spi_device=0):
+    def __init__(self, channel=1, spi_bus=0, spi_device=0, spi=None, profile=None):
+        """
+        Args:
+            spi: 이미 열린 SPI 객체 (벤치마크 시뮬레이터 등), None이면 spidev로 열기
+            profile: 타이밍 보정값, None이면 calibration.json (없으면 기본값)
+        """
         self.channel = channel
-        self.spi = spidev.SpiDev()
-        self.spi.open(spi_bus, spi_device)
-        self.spi.max_speed_hz = 1350000
+        profile = profile or load_calibration()
+        self.sleep_interval = profile["sleep_interval"]
+        self.sample_period = profile["sample_period"]
+        self.strategy = profile["strategy"]
+        # 마지막 detect_heartbeat의 신호 품질 경고 (too_noisy 등, 없으면 None)
+        self.last_warning = None
+        if spi is None:
+            # 라즈베리파이에서만 설치되므로 실제 SPI를 열 때만 import
+            import spidev
+            spi = spidev.SpiDev()
+            spi.open(spi_bus, spi_device)
+        self.spi = spi
+        self.spi.max_speed_hz = profile["max_speed_hz"]
         
     def read_adc(self):
         adc = self.spi.xfer2([1, (8 + self.channel) << 4, 0])
@@ -23,14 +119,45 @@ class HeartRateSensor:
         variance = sum((x - mean) ** 2 for x in values) / len(values)
         return variance ** 0.5
     
-    def detect_heartbeat(self, duration=15):
+    def detect_heartbeat(self, duration=15, quality_window=QUALITY_WINDOW):
+        """
+        심박수 측정
+        
+        측정 초반 quality_window초 동안 신호 품질을 확인하고,
+        손가락이 없거나 신호가 포화되면 SignalQualityError로 바로 중단
+        측정은 계속해도 되는 경고(too_noisy)는 last_warning에 저장
+        """
+        self.last_warning = None
         samples = []
+        monitor = SignalQualityMonitor()
+        quality_checked = False
         start_time = time.time()
+        next_tick = start_time
         
         while time.time() - start_time < duration:
             value = self.read_adc()
             samples.append(value)
-            time.sleep(0.01)
+            
+            if not quality_checked:
+                monitor.update(value)
+                if time.time() - start_time >= quality_window:
+                    self.last_warning = monitor.evaluate()
+                    quality_checked = True
+            
+            if self.strategy == "deadline":
+                # 다음 샘플 시각까지만 대기 (읽기 시간과 무관하게 간격 유지)
+                next_tick += self.sleep_interval
+                remaining = next_tick - time.time()
+                if remaining > 0:
+                    time.sleep(remaining)
+                else:
+                    # 밀린 경우 몰아서 읽지 않고 현재 시각 기준으로 다시 맞춤 (spi_benchmark와 동일)
+                    next_tick = time.time()
+            else:
+                time.sleep(self.sleep_interval)
+        
+        if not quality_checked:
+            self.last_warning = monitor.evaluate()
         
         mean_value = self.calculate_mean(samples)
         std_value = self.calculate_std(samples)
@@ -41,7 +168,7 @@ class HeartRateSensor:
         beat_intervals = []
         
         for i, value in enumerate(samples):
-            current_time = i * 0.01
+            current_time = i * self.sample_period
             
             if i > 0 and samples[i-1] < threshold and value >= threshold:
                 if current_time - last_beat_time > 0.3:
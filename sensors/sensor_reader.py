@@ -49,7 +49,8 @@ class SensorManager:
         
         return {
             'temperature': temperature if temperature else 36.5,
-            'heart_rate': heart_rate if heart_rate else 70
+            'heart_rate': heart_rate if heart_rate else 70,
+            'warning': self.heart_sensor.last_warning if self.heart_sensor else None
         }
     
     def close(self):
@@ -0,0 +1,222 @@
+"""
+SPI 샘플링 성능 측정 및 자동 보정
+
+SPI 클럭 속도와 읽기 방식별로 실제 샘플링 속도, 지터, 1회 읽기 지연시간을 측정하고
+목표 샘플링 속도에 가장 가까운 설정을 보정 프로파일(calibration.json)로 저장합니다.
+HeartRateSensor는 생성 시 이 프로파일을 읽어 타이밍 값을 설정합니다.
+
+사용법:
+    python -m sensors.spi_benchmark                 # 실제 센서 (라즈베리파이)
+    python -m sensors.spi_benchmark --simulate      # 시뮬레이터
+    python -m sensors.spi_benchmark --no-save       # 결과만 출력
+"""
+import argparse
+import math
+import sys
+import time
+
+from sensors.calibration import save_calibration, CALIBRATION_PATH
+
+SPEEDS_HZ = [500000, 1000000, 1350000, 2000000, 3600000]
+STRATEGIES = ["sleep", "deadline", "busy"]
+TARGET_RATE = 100  # 심박 분석 코드가 가정하는 샘플링 속도 (Hz)
+
+
+class SimulatedSpi:
+    """
+    spidev.SpiDev 대용 시뮬레이터
+
+    3바이트 전송 시간(클럭 속도 기준) + 고정 오버헤드만큼 지연하고
+    1.2Hz(72 BPM) 맥파 형태의 10bit 값을 돌려줌
+    """
+    def __init__(self, overhead=0.00005):
+        self.max_speed_hz = 1350000
+        self.overhead = overhead
+        self.start = time.perf_counter()
+
+    def xfer2(self, data):
+        transfer_time = len(data) * 8 / self.max_speed_hz + self.overhead
+        end = time.perf_counter() + transfer_time
+        while time.perf_counter() < end:
+            pass
+        t = time.perf_counter() - self.start
+        value = int(512 + 150 * math.sin(2 * math.pi * 1.2 * t))
+        return [0, (value >> 8) & 3, value & 0xFF]
+
+    def close(self):
+        pass
+
+
+def run_strategy(sensor, strategy, duration, interval):
+    """
+    읽기 방식별 샘플링
+
+    sleep: 읽기 후 interval만큼 대기 (기존 detect_heartbeat 방식, 실제 간격 = 읽기 시간 + interval)
+    deadline: 다음 샘플 시각까지 남은 시간만 대기 (고정 간격 유지)
+    busy: 대기 없이 연속 읽기 (최대 속도)
+
+    Returns:
+        (샘플 시각 리스트, 1회 읽기 지연시간 리스트)
+    """
+    timestamps = []
+    latencies = []
+    start = time.perf_counter()
+    next_tick = start
+
+    while True:
+        now = time.perf_counter()
+        if now - start >= duration:
+            break
+
+        read_start = time.perf_counter()
+        sensor.read_adc()
+        read_end = time.perf_counter()
+        timestamps.append(read_start)
+        latencies.append(read_end - read_start)
+
+        if strategy == "sleep":
+            time.sleep(interval)
+        elif strategy == "deadline":
+            next_tick += interval
+            remaining = next_tick - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            else:
+                # 밀린 경우 현재 시각 기준으로 다시 맞춤
+                next_tick = time.perf_counter()
+
+    return timestamps, latencies
+
+
+def summarize(timestamps, latencies):
+    intervals = [b - a for a, b in zip(timestamps, timestamps[1:])]
+    if not intervals:
+        return None
+
+    mean_interval = sum(intervals) / len(intervals)
+    jitter = (sum((x - mean_interval) ** 2 for x in intervals) / len(intervals)) ** 0.5
+    sorted_latencies = sorted(latencies)
+    p95 = sorted_latencies[min(len(sorted_latencies) - 1, int(len(sorted_latencies) * 0.95))]
+
+    return {
+        "samples": len(timestamps),
+        "sample_rate": round(1 / mean_interval, 2) if mean_interval > 0 else 0.0,
+        "sample_period": mean_interval,
+        "jitter_ms": round(jitter * 1000, 3),
+        "latency_mean_us": round(sum(latencies) / len(latencies) * 1e6, 1),
+        "latency_p95_us": round(p95 * 1e6, 1)
+    }
+
+
+def benchmark(sensor, speeds=SPEEDS_HZ, strategies=STRATEGIES, duration=2.0, interval=0.01):
+    """모든 (클럭 속도, 읽기 방식) 조합 측정"""
+    results = []
+    for speed in speeds:
+        sensor.spi.max_speed_hz = speed
+        for strategy in strategies:
+            timestamps, latencies = run_strategy(sensor, strategy, duration, interval)
+            summary = summarize(timestamps, latencies)
+            if not summary:
+                continue
+            summary.update({"max_speed_hz": speed, "strategy": strategy})
+            results.append(summary)
+            print(
+                f"{speed:>9} Hz | {strategy:<8} | "
+                f"{summary['sample_rate']:>9.2f} Hz | "
+                f"지터 {summary['jitter_ms']:>7.3f} ms | "
+                f"지연 평균 {summary['latency_mean_us']:>7.1f} us, p95 {summary['latency_p95_us']:>7.1f} us"
+            )
+    return results
+
+
+def choose_profile(results, target_rate=TARGET_RATE, interval=0.01):
+    """
+    보정 프로파일 선택
+
+    busy는 CPU를 계속 점유하고 detect_heartbeat에서 지원하지 않으므로 제외하고,
+    목표 속도와의 차이 → 지터 → 지연시간 순으로 선택 (sleep/deadline 결과가 없으면 None)
+    deadline 방식은 대기 시간이 읽기 시간을 포함하므로 sleep_interval 대신 목표 간격을 그대로 사용
+    """
+    candidates = [r for r in results if r["strategy"] != "busy"]
+    if not candidates:
+        return None
+    best = min(
+        candidates,
+        key=lambda r: (abs(r["sample_rate"] - target_rate), r["jitter_ms"], r["latency_mean_us"])
+    )
+
+    if best["strategy"] == "sleep":
+        # 실제 간격이 읽기 시간만큼 길어지므로 그만큼 대기 시간을 줄임
+        read_overhead = max(0.0, best["sample_period"] - interval)
+        sleep_interval = max(0.0, 1 / target_rate - read_overhead)
+        sample_period = sleep_interval + read_overhead
+    else:
+        sleep_interval = interval
+        sample_period = best["sample_period"]
+
+    return {
+        "max_speed_hz": best["max_speed_hz"],
+        "sleep_interval": round(sleep_interval, 6),
+        "sample_period": round(sample_period, 6),
+        "strategy": best["strategy"],
+        "measured": {
+            "sample_rate": best["sample_rate"],
+            "jitter_ms": best["jitter_ms"],
+            "latency_mean_us": best["latency_mean_us"],
+            "latency_p95_us": best["latency_p95_us"],
+            "measured_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="심박센서 SPI 샘플링 벤치마크 및 보정")
+    parser.add_argument("--simulate", action="store_true", help="실제 센서 대신 시뮬레이터 사용")
+    parser.add_argument("--channel", type=int, default=0, help="MCP3008 채널 (기본 0)")
+    parser.add_argument("--duration", type=float, default=2.0, help="조합별 측정 시간 (초)")
+    parser.add_argument("--speeds", type=int, nargs="+", default=SPEEDS_HZ, help="측정할 SPI 클럭 속도 (Hz)")
+    parser.add_argument("--strategies", nargs="+", default=STRATEGIES, choices=STRATEGIES)
+    parser.add_argument("--target-rate", type=float, default=TARGET_RATE, help="목표 샘플링 속도 (Hz)")
+    parser.add_argument("--output", default=CALIBRATION_PATH, help="보정 프로파일 저장 경로")
+    parser.add_argument("--no-save", action="store_true", help="프로파일을 저장하지 않음")
+    args = parser.parse_args()
+
+    from sensors.calibration import DEFAULT_PROFILE
+    from sensors.heart_sensor import HeartRateSensor
+
+    spi = SimulatedSpi() if args.simulate else None
+    sensor = HeartRateSensor(channel=args.channel, spi=spi, profile=DEFAULT_PROFILE)
+
+    print("=" * 60)
+    print(f"SPI 샘플링 벤치마크 ({'시뮬레이터' if args.simulate else '실제 센서'})")
+    print("=" * 60)
+
+    try:
+        interval = 1 / args.target_rate
+        results = benchmark(sensor, args.speeds, args.strategies, args.duration, interval)
+    finally:
+        sensor.close()
+
+    if not results:
+        print("측정 결과가 없습니다")
+        return
+
+    profile = choose_profile(results, args.target_rate, interval)
+    if profile is None:
+        print("sleep 또는 deadline 결과가 없어 보정 프로파일을 만들 수 없습니다 (busy는 측정용으로만 사용)")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(
+        f"선택: {profile['max_speed_hz']} Hz, {profile['strategy']}, "
+        f"대기 {profile['sleep_interval'] * 1000:.2f} ms, "
+        f"실제 간격 {profile['sample_period'] * 1000:.2f} ms"
+    )
+
+    if not args.no_save:
+        path = save_calibration(profile, args.output)
+        print(f"보정 프로파일 저장: {path}")
+
+
+if __name__ == "__main__":
+    main()